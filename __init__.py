@@ -1,6 +1,10 @@
 import asyncio
+import concurrent.futures
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import deque
+from datetime import timedelta
 from typing import Any
 
 import homeassistant.helpers.config_validation as cv
@@ -9,12 +13,70 @@ from homeassistant.const import (
     CONF_PASSWORD,
     CONF_PIN,
     CONF_USERNAME,
+    EVENT_HOMEASSISTANT_STOP,
 )
+from homeassistant.components import persistent_notification
 from homeassistant.helpers import discovery
+from homeassistant.helpers.event import track_time_interval
 from homeassistant.util import Throttle
-from onstar.onstar import OnStar
 
-from .const import DOMAIN, MIN_TIME_BETWEEN_UPDATES, ONSTAR_COMPONENTS
+from .callback_watchdog import CallbackWatchdog
+from .client import OnStarClient
+from .const import (
+    CONF_FLEET_SENSORS,
+    CONF_FLUSH_INTERVAL,
+    CONF_MAINTENANCE_DISTANCE,
+    CONF_MAX_STALENESS,
+    CONF_PLACES_FILE,
+    CONF_PLATFORMS,
+    CONF_RECORD_BACKUP_COUNT,
+    CONF_RECORD_DIR,
+    CONF_RECORD_MAX_BYTES,
+    CONF_REPLAY_DIR,
+    CONF_REPLAY_SPEED,
+    CONF_SENSORS,
+    CONF_STATE_FILE,
+    CONF_WAKE_INTERVAL,
+    CONF_WATCHDOG_THRESHOLD,
+    DEFAULT_FLUSH_INTERVAL,
+    DEFAULT_MAINTENANCE_DISTANCE,
+    DEFAULT_MAX_STALENESS,
+    DEFAULT_WAKE_INTERVAL,
+    DOMAIN,
+    INITIAL_FETCH_TIMEOUT,
+    LOCATION_HISTORY_SIZE,
+    LOCATION_MATCH_RUN,
+    LOCATION_INPUTS,
+    MIN_TIME_BETWEEN_UPDATES,
+    PARKED_IGNITION,
+    ONSTAR_COMPONENTS,
+    SUBSCRIPTION_QUEUE_SIZE,
+)
+from .diagnostics import (
+    SECTION_SENSOR_PREFIX,
+    decode_section,
+    extract_status,
+    get_date,
+    latest_location,
+    parse_date,
+    section_names,
+)
+from .executor import OnStarExecutor
+from .export import EXPORT_FORMATS, FORMAT_NDJSON, export_history
+from .fleet import FLEET_INPUTS, FleetAggregator
+from .forecast import FORECAST_INPUTS, FORECAST_TYPES, MaintenanceForecaster
+from .geocode import ReverseGeocoder, coordinates
+from .parking import ParkingClusterer
+from .persistence import DeltaStore
+from .profiler import MODE_CPROFILE, PROFILE_MODES, CycleProfiler
+from .replay import (
+    DEFAULT_BACKUP_COUNT,
+    DEFAULT_MAX_BYTES,
+    ReplayOnStar,
+    ResponseRecorder,
+)
+from .subscription import StatusChange, SubscriptionHub
+from .transport import REQUEST_TIMEOUT, TRANSPORT_ERRORS, PooledTransport
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,6 +89,35 @@ CONFIG_SCHEMA = vol.Schema(
             vol.Required(CONF_USERNAME): cv.string,
             vol.Required(CONF_PASSWORD): cv.string,
             vol.Optional(CONF_PIN): cv.string,
+            vol.Optional(CONF_RECORD_DIR): cv.string,
+            vol.Optional(
+                CONF_RECORD_MAX_BYTES, default=DEFAULT_MAX_BYTES
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Optional(
+                CONF_RECORD_BACKUP_COUNT, default=DEFAULT_BACKUP_COUNT
+            ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(CONF_REPLAY_DIR): cv.string,
+            vol.Optional(CONF_REPLAY_SPEED, default=0): vol.Coerce(float),
+            vol.Optional(
+                CONF_MAX_STALENESS, default=DEFAULT_MAX_STALENESS
+            ): cv.time_period,
+            vol.Optional(
+                CONF_WAKE_INTERVAL, default=DEFAULT_WAKE_INTERVAL
+            ): cv.time_period,
+            vol.Optional(CONF_PLACES_FILE): cv.string,
+            vol.Optional(CONF_WATCHDOG_THRESHOLD): vol.Coerce(float),
+            vol.Optional(CONF_FLEET_SENSORS, default=False): cv.boolean,
+            vol.Optional(CONF_PLATFORMS, default=ONSTAR_COMPONENTS): vol.All(
+                cv.ensure_list, [vol.In(ONSTAR_COMPONENTS)]
+            ),
+            vol.Optional(CONF_SENSORS): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional(CONF_STATE_FILE): cv.string,
+            vol.Optional(
+                CONF_FLUSH_INTERVAL, default=DEFAULT_FLUSH_INTERVAL
+            ): cv.time_period,
+            vol.Optional(
+                CONF_MAINTENANCE_DISTANCE, default=DEFAULT_MAINTENANCE_DISTANCE
+            ): vol.Coerce(int),
             }
         )
     },
@@ -34,9 +125,44 @@ CONFIG_SCHEMA = vol.Schema(
 )
 
 SERVICE_UPDATE_STATE = "update_state"
+SERVICE_EXPORT_HISTORY = "export_history"
+SERVICE_PROFILE = "profile"
+
+ATTR_FILENAME = "filename"
+ATTR_FORMAT = "format"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_FIELDS = "fields"
+ATTR_VIN = "vin"
+ATTR_CYCLES = "cycles"
+ATTR_MODE = "mode"
+
+EXPORT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_FILENAME): cv.string,
+        vol.Optional(ATTR_FORMAT, default=FORMAT_NDJSON): vol.In(EXPORT_FORMATS),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_FIELDS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_VIN): cv.string,
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CYCLES, default=1): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+        vol.Optional(ATTR_MODE, default=MODE_CPROFILE): vol.In(PROFILE_MODES),
+    }
+)
 
 # MIN_TIME_BETWEEN_UPDATES and ONSTAR_COMPONENTS moved to const.py
 
+# A snapshot only turns stale once its refresh is clearly overdue, so the
+# flag does not flip for the time a due refresh takes to land
+STALE_AFTER = 2 * MIN_TIME_BETWEEN_UPDATES + timedelta(seconds=REQUEST_TIMEOUT)
+
 def setup(hass, base_config: dict):
     if base_config is None:
         _LOGGER.error("Base configuration is missing")
@@ -51,34 +177,235 @@ def setup(hass, base_config: dict):
     password = config.get(CONF_PASSWORD)
     pin = config.get(CONF_PIN)
     
-    hass.data[DOMAIN] = OnStarData(username, password, pin)
+    recorder = None
+    record_dir = None
+    if config.get(CONF_RECORD_DIR):
+        record_dir = hass.config.path(config[CONF_RECORD_DIR])
+        recorder = ResponseRecorder(
+            record_dir,
+            config.get(CONF_RECORD_MAX_BYTES, DEFAULT_MAX_BYTES),
+            config.get(CONF_RECORD_BACKUP_COUNT, DEFAULT_BACKUP_COUNT))
+        hass.bus.listen_once(
+            EVENT_HOMEASSISTANT_STOP, lambda event: recorder.close())
+
+    replay = None
+    if config.get(CONF_REPLAY_DIR):
+        _LOGGER.warning("Replaying recorded OnStar responses, no network is used")
+        replay = ReplayOnStar(
+            hass.config.path(config[CONF_REPLAY_DIR]),
+            config.get(CONF_REPLAY_SPEED, 0),
+        )
+
+    geocoder = None
+    if config.get(CONF_PLACES_FILE):
+        try:
+            geocoder = ReverseGeocoder.from_csv(
+                hass.config.path(config[CONF_PLACES_FILE]))
+        except OSError as err:
+            _LOGGER.error("Unable to load places for geocoding: %s", err)
+
+    watchdog = None
+    if config.get(CONF_WATCHDOG_THRESHOLD):
+        watchdog = CallbackWatchdog(config[CONF_WATCHDOG_THRESHOLD])
+        watchdog.probe_loop(hass.loop)
+        hass.bus.listen_once(
+            EVENT_HOMEASSISTANT_STOP, lambda event: watchdog.stop())
+
+    fleet = None
+    if config.get(CONF_FLEET_SENSORS):
+        fleet = FleetAggregator(config.get(
+            CONF_MAINTENANCE_DISTANCE, DEFAULT_MAINTENANCE_DISTANCE))
+
+    store = None
+    if config.get(CONF_STATE_FILE):
+        store = DeltaStore(hass.config.path(config[CONF_STATE_FILE]))
+        track_time_interval(
+            hass, lambda now: store.flush(),
+            config.get(CONF_FLUSH_INTERVAL, DEFAULT_FLUSH_INTERVAL))
+        hass.bus.listen_once(
+            EVENT_HOMEASSISTANT_STOP, lambda event: store.flush())
+
+    platforms = config.get(CONF_PLATFORMS, ONSTAR_COMPONENTS)
+    sensors = config.get(CONF_SENSORS)
+    if "sensor" not in platforms:
+        sensors = []
+    # The PIN protected location query is only made for someone to show it
+    locate = "device_tracker" in platforms or (
+        sensors is None or "onstar.localization" in sensors)
+
+    hass.data[DOMAIN] = OnStarData(
+        username, password, pin, recorder=recorder, replay=replay,
+        max_staleness=config.get(CONF_MAX_STALENESS, DEFAULT_MAX_STALENESS),
+        wake_interval=config.get(CONF_WAKE_INTERVAL, DEFAULT_WAKE_INTERVAL),
+        geocoder=geocoder, watchdog=watchdog, fleet=fleet,
+        transport=PooledTransport(), fields=sensors, locate=locate,
+        store=store)
+    if store is not None:
+        hass.data[DOMAIN].restore(store.restore())
+
+    def _register(service, handler, schema=None) -> None:
+        if watchdog is not None:
+            handler = watchdog.watch("service %s" % service, handler)
+        hass.services.register(DOMAIN, service, handler, schema=schema)
+
+    def _shutdown(event) -> None:
+        hass.data[DOMAIN].executor.shutdown()
+        hass.data[DOMAIN].transport.close()
+
+    hass.bus.listen_once(EVENT_HOMEASSISTANT_STOP, _shutdown)
     def _update(call) -> None:
         _LOGGER.info("Update service called")
-        hass.data[DOMAIN].update()
+        # An explicit request is the one case the vehicle is always woken
+        hass.data[DOMAIN].update(no_throttle=True, wake=True)
     
-    hass.services.register(DOMAIN, SERVICE_UPDATE_STATE, _update)
+    _register(SERVICE_UPDATE_STATE, _update)
+
+    def _export_history(call) -> None:
+        if record_dir is None:
+            _LOGGER.error(
+                "History export needs %s to be configured", CONF_RECORD_DIR)
+            return
+        path = hass.config.path(call.data[ATTR_FILENAME])
+        if not hass.config.is_allowed_path(path):
+            _LOGGER.error("Export to %s is not allowed", path)
+            return
+        start = call.data.get(ATTR_START)
+        end = call.data.get(ATTR_END)
+        export_history(
+            record_dir,
+            path,
+            call.data.get(ATTR_FORMAT, FORMAT_NDJSON),
+            start=start.timestamp() if start else None,
+            end=end.timestamp() if end else None,
+            fields=call.data.get(ATTR_FIELDS),
+            vin=call.data.get(ATTR_VIN),
+            # Forecasts derive from the live trends, not from single reports
+            columns=[
+                sensor_type for sensor_type in hass.data[DOMAIN].SENSOR_TYPES
+                if sensor_type not in FORECAST_TYPES
+            ],
+        )
+
+    _register(SERVICE_EXPORT_HISTORY, _export_history, EXPORT_HISTORY_SCHEMA)
 
-    for component in ONSTAR_COMPONENTS:
+    def _report_profile(message) -> None:
+        persistent_notification.create(
+            hass, message, title="OnStar profile",
+            notification_id="onstar_profile")
+
+    def _profile(call) -> None:
+        hass.data[DOMAIN].profiler.start(
+            call.data.get(ATTR_CYCLES, 1),
+            call.data.get(ATTR_MODE, MODE_CPROFILE),
+            hass.config.path(),
+            _report_profile,
+        )
+
+    _register(SERVICE_PROFILE, _profile, PROFILE_SCHEMA)
+
+    # Platforms set up concurrently and share this single initial fetch
+    hass.data[DOMAIN].start_initial_fetch()
+
+    for component in platforms:
         discovery.load_platform(hass, component, DOMAIN, {}, config)
 
     _LOGGER.info("Done initialization")
     return True
 
 
+# Compares two values of field key, fixes by their coordinates whatever
+# their shape (a restored fix is a tuple, a live one a list or object)
+def _same(key, old, new):
+    if key == "onstar.localization":
+        return coordinates(old) == coordinates(new)
+    return old == new
+
+
 class OnStarData(object):
     """Stores the data retrieved from OnStar.
     For each entity to use, acts as the single point responsible for fetching
     updates from the server.
     """
 
-    def __init__(self, username, password, pin):
+    def __init__(self, username, password, pin, recorder=None, replay=None,
+                 executor=None, max_staleness=DEFAULT_MAX_STALENESS,
+                 wake_interval=DEFAULT_WAKE_INTERVAL, geocoder=None,
+                 watchdog=None, transport=None, fleet=None, fields=None,
+                 locate=True, store=None):
         """Initialize the data object."""
         self._username = username
         self._password = password
         self._pin = pin
+        self._recorder = recorder
+        self._replay = replay
+        self._executor = executor or OnStarExecutor()
+        self._transport = transport or PooledTransport()
+        self._profiler = CycleProfiler()
+        # Opt-in measurement of callbacks and entity updates
+        self.watchdog = watchdog
 
         self.gps_position = None
+        # Readable address of the latest fix, when a place dataset is given
+        self.address = None
+        self._geocoder = geocoder
+        # Known fixes, oldest first
+        self._location_history = deque(maxlen=LOCATION_HISTORY_SIZE)
+        # Newest fixes of the last report, newest first
+        self._report_head: list = []
         self._status: dict[str, Any] | None = None
+        self._revision = 0
+        # Per field epoch time of the last value change
+        self._last_changed: dict[str, float] = {}
+        # Per vehicle (updatedOn, latest fix) of the last extracted report
+        self._last_seen: dict[str, tuple] = {}
+        # Per vehicle raw diagnostics result, its sections are decoded on demand
+        self._reports: dict[str, Any] = {}
+
+        # Last good snapshot is served while a background refresh runs,
+        # until it gets older than max_staleness
+        self._max_staleness = max_staleness
+        self._updated_at: float | None = None
+        # Epoch time of the last successful refresh, shown to users
+        self._refreshed_at: float | None = None
+        self._attempted_at: float | None = None
+        self._refresh_failed = False
+        self._refresh_lock = threading.Lock()
+        # Explicit updates and revalidations may run on both pool workers,
+        # refreshes mutate shared state and are run one at a time
+        self._refresh_running = threading.Lock()
+        self._revalidation = None
+        self._initial_fetch = None
+
+        # Routine refreshes only read the cloud cache, the vehicle is woken at
+        # most once per wake_interval while parked
+        self._wake_interval = wake_interval
+        self._woken_at: float | None = None
+
+        # Running per vehicle trends behind the maintenance forecasts
+        self._forecaster = MaintenanceForecaster()
+
+        # Consumers notified of field changes, see async_subscribe
+        self._subscriptions = SubscriptionHub()
+        # Fleet aggregates fed with the same changes, when enabled
+        self.fleet = fleet
+        # Persists snapshots across restarts, when enabled
+        self._store = store
+
+        # Sensor types to publish, None for all, and what is fetched for them
+        self._fields = None if fields is None else frozenset(fields)
+        self._locate = locate
+        self._forecast = fields is None or not self._fields.isdisjoint(FORECAST_TYPES)
+        self._extract_fields = None
+        if fields is not None:
+            self._extract_fields = set(self._fields) | {"onstar.vin"}
+            if self._forecast:
+                self._extract_fields |= FORECAST_INPUTS
+            if fleet is not None:
+                self._extract_fields |= FLEET_INPUTS
+            if locate:
+                self._extract_fields |= LOCATION_INPUTS
+        # Frequent parking spots, learnt from the fixes of parked vehicles
+        self.parking = ParkingClusterer() if locate else None
 
         self.SENSOR_TYPES = {
             'onstar.plate': ['Plate', '', 'mdi:account-card-details'],
@@ -107,69 +434,448 @@ class OnStarData(object):
             'onstar.localization': ['Latest localization', None, 'mdi:compass'],
             'onstar.vin': ['VIN', None, 'mdi:id-card'],
         }
+        self.SENSOR_TYPES.update(FORECAST_TYPES)
+        if self._fields is not None:
+            for sensor_type in self._fields - set(self.SENSOR_TYPES):
+                if sensor_type.startswith(SECTION_SENSOR_PREFIX):
+                    continue
+                _LOGGER.warning("Unknown OnStar sensor type: %s", sensor_type)
 
     # Retrieves info from OnStar
-    def _get_status(self):
+    def _get_status(self, wake=None):
 
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            o = OnStar(self._username, self._password, self._pin, loop)
-            loop.run_until_complete(o.refresh())
-
-            v: dict[str, Any] = {}
-            v["onstar.plate"]=o.get_diagnostics().results[0].vehicle.licensePlate
-            v["onstar.vin"]=o.get_diagnostics().results[0].vehicle.vehicleVIN
-            v["onstar.laststatus"]=self._get_date(o.get_diagnostics().results[0].updatedOn)
-            v["onstar.warningcount"]=o.get_diagnostics().results[0].warningCount
-            v["onstar.errorcount"]=o.get_diagnostics().results[0].errorCount
-            v["onstar.oillife"]=round(o.get_diagnostics().results[0].reportData.metrics.oilLife*100,1)
-            v["onstar.fuellevel"]=int(round(o.get_diagnostics().results[0].reportData.metrics.fuelLevel*100))
-            v["onstar.range"]=int(round(o.get_diagnostics().results[0].reportData.metrics.fuelRange))
-            v["onstar.ignition"]=o.get_diagnostics().results[0].reportData.metrics.ignition
-            v["onstar.odometer"]=int(round(o.get_diagnostics().results[0].reportData.metrics.odometer))
-            v["onstar.tirelf"]=o.get_diagnostics().results[0].reportData.metrics.tirePressureLf
-            v["onstar.tirelr"]=o.get_diagnostics().results[0].reportData.metrics.tirePressureLr
-            v["onstar.tirerf"]=o.get_diagnostics().results[0].reportData.metrics.tirePressureRf
-            v["onstar.tirerr"]=o.get_diagnostics().results[0].reportData.metrics.tirePressureRr
-            v["onstar.tirestatuslf"]=o.get_diagnostics().results[0].reportData.metrics.tireStatusLf=="GREEN"
-            v["onstar.tirestatuslr"]=o.get_diagnostics().results[0].reportData.metrics.tireStatusLr=="GREEN"
-            v["onstar.tirestatusrf"]=o.get_diagnostics().results[0].reportData.metrics.tireStatusRf=="GREEN"
-            v["onstar.tirestatusrr"]=o.get_diagnostics().results[0].reportData.metrics.tireStatusRr=="GREEN"
-            v["onstar.tiresetting"]=o.get_diagnostics().results[0].reportData.metrics.placardSetting
-            v["onstar.ftirepressure"]=o.get_diagnostics().results[0].reportData.metrics.placardFront
-            v["onstar.rtirepressure"]=o.get_diagnostics().results[0].reportData.metrics.placardRear
-            v["onstar.nextmaindate"]=o.get_diagnostics().results[0].reportData.maintenance.nextMaintDate
-            v["onstar.nextmainodo"]=int(round(o.get_diagnostics().results[0].reportData.maintenance.nextMaintOdometer))
-            v["onstar.airbagok"]=o.get_diagnostics().results[0].reportData.sections.airbag.status=="GREEN"
-            v["onstar.localization"]=self._get_location(o.get_location().results)
+            if not self._locate:
+                # Nothing shows the location, never query it
+                wake = False
+            elif wake is None:
+                wake = self._wake_due()
+
+            # Runs on the transport's long-lived loop, reusing its session
+            async def fetch(session):
+                if self._replay is not None:
+                    client = self._replay
+                else:
+                    client = OnStarClient(
+                        self._username, self._password, self._pin,
+                        asyncio.get_running_loop(), session=session)
+                refresh = client.refresh(wake=wake)
+                if self.watchdog is not None:
+                    refresh = self.watchdog.watch_coroutine(
+                        "transport request", refresh)
+                with self._profiler.thread_profile():
+                    await refresh
+                return client
 
+            _LOGGER.debug("Refreshing OnStar data (wake: %s)", wake)
+            o = self._transport.run(fetch)
+            _LOGGER.debug("OnStar transport stats: %s", self._transport.stats)
+            if wake:
+                self._woken_at = time.monotonic()
+            if self._recorder is not None:
+                self._recorder.record_client(o)
+
+            result = o.get_diagnostics().results[0]
+            self._reports[result.vehicle.vehicleVIN] = result
+            location = o.get_location()
+            # Without a wake-up the last known fix is kept
+            location_report = None if location is None else location.results
+            vin = result.vehicle.vehicleVIN
+            seen = self._seen(result, location_report)
+            if self._unchanged(vin, seen):
+                _LOGGER.debug("OnStar report unchanged since last refresh")
+                return self._status
+
+            v = extract_status(result, self._extract_fields)
+            if self._forecast:
+                v.update(self._forecaster.add(v, parse_date(result.updatedOn)))
+            if self._locate:
+                if location_report is None:
+                    v["onstar.localization"]=self.gps_position
+                else:
+                    v["onstar.localization"]=self._get_location(location_report)
+
+            # Only a report that made it into a snapshot counts as seen
+            self._last_seen[vin] = seen
             return v
-        except (ConnectionResetError) as err:
+        except TRANSPORT_ERRORS as err:
             _LOGGER.debug(
                 "Error getting OnStar info: %s", err)
             return None
 
+    # Identifies a report by its updatedOn and latest fix
+    def _seen(self, result, location_report):
+        if location_report is None:
+            previous = self._last_seen.get(result.vehicle.vehicleVIN)
+            fix = previous[1] if previous else None
+        else:
+            fix = latest_location(location_report)
+        return (result.updatedOn, fix)
+
+    # Checks whether the cloud still serves the report and fix already
+    # extracted, in which case extraction and publishing are skipped
+    def _unchanged(self, vin, seen):
+        return (
+            self._last_seen.get(vin) == seen
+            and self._status is not None
+            and self._status.get("onstar.vin") == vin
+        )
+
+    # Decides whether a routine refresh may wake the vehicle
+    def _wake_due(self):
+        if self._woken_at is None:
+            # Nothing known about the position yet
+            return True
+        if self._status is not None and self._status.get(
+                "onstar.ignition") not in PARKED_IGNITION:
+            # A running car is awake anyway
+            return True
+        interval = self._wake_interval.total_seconds()
+        return bool(interval) and (
+            time.monotonic() - self._woken_at >= interval)
+
     @property
     def status(self):
         """Return the current status."""
         return self._status
 
+    @property
+    def fields(self):
+        """Return the sensor types entities are created for."""
+        if self._fields is None:
+            return set(self.SENSOR_TYPES)
+        return self._fields
+
+    def _report(self, vin):
+        if vin is None and self._status is not None:
+            vin = self._status.get("onstar.vin")
+        return self._reports.get(vin)
+
+    def report_sections(self, vin=None):
+        """Return the enabled diagnostics sections without a dedicated sensor."""
+        report = self._report(vin)
+        if report is None:
+            return []
+        return [
+            name for name in section_names(report)
+            if self._fields is None
+            or SECTION_SENSOR_PREFIX + name in self._fields
+        ]
+
+    def section(self, name, vin=None):
+        """Decode and return a diagnostics section of the latest report."""
+        report = self._report(vin)
+        if report is None:
+            return None
+        return decode_section(report, name)
+
+    @property
+    def revision(self):
+        """Return a counter increased whenever the status changes."""
+        return self._revision
+
+    def last_changed(self, sensor_type):
+        """Return the epoch time sensor_type last changed value."""
+        return self._last_changed.get(sensor_type)
+
+    def async_subscribe(self, vin=None, fields=None,
+                        maxsize=SUBSCRIPTION_QUEUE_SIZE, snapshot=False):
+        """Return an async iterator of StatusChange for the calling loop.
+
+        Changes can be limited to a vehicle and to some fields. When the
+        consumer falls more than maxsize changes behind, the oldest are
+        dropped. With snapshot, the current status is delivered first.
+        """
+        subscription = self._subscriptions.subscribe(
+            asyncio.get_running_loop(), vin, fields, maxsize)
+        status = self._status
+        if snapshot and status is not None:
+            subscription._put(StatusChange(  # pylint: disable=protected-access
+                status.get("onstar.vin"), self._revision, time.time(),
+                {key: (None, value) for key, value in status.items()}))
+        return subscription
+
+    def async_listen(self, callback, vin=None, fields=None,
+                     maxsize=SUBSCRIPTION_QUEUE_SIZE):
+        """Run callback(StatusChange) on the calling loop for each change.
+
+        Return a function removing the listener.
+        """
+        return self._subscriptions.subscribe(
+            asyncio.get_running_loop(), vin, fields, maxsize, callback).close
+
+    @property
+    def data_age(self):
+        """Return seconds since the last successful refresh."""
+        if self._updated_at is None:
+            return None
+        return time.monotonic() - self._updated_at
+
+    @property
+    def last_refresh(self):
+        """Return the epoch time of the last successful refresh."""
+        return self._refreshed_at
+
+    @property
+    def stale(self):
+        """Return True if the last refresh failed or the snapshot is overdue."""
+        age = self.data_age
+        return (
+            self._refresh_failed
+            or age is None
+            or age > STALE_AFTER.total_seconds()
+        )
+
+    @property
+    def expired(self):
+        """Return True if the snapshot is too old to be served."""
+        age = self.data_age
+        return age is None or age > self._max_staleness.total_seconds()
+
+    @property
+    def profiler(self):
+        """Return the profiler wrapping refresh cycles."""
+        return self._profiler
+
+    @property
+    def transport(self):
+        """Return the pooled HTTP transport."""
+        return self._transport
+
+    @property
+    def transport_stats(self):
+        """Return connection reuse statistics of the OnStar transport."""
+        return self._transport.stats
+
+    @property
+    def executor(self):
+        """Return the pool running blocking OnStar I/O."""
+        return self._executor
+
+    @property
+    def executor_stats(self):
+        """Return queue depth and job counters of the OnStar pool."""
+        return self._executor.stats
+
     # Formats date from 2019-10-16T10:54:52.535+02:00 to human readable
     def _get_date(self, str_date):
-        date = datetime.strptime(str_date, '%Y-%m-%dT%H:%M:%S.%f%z')
-        return date.strftime('%Y-%m-%d %H:%M:%S')
+        return get_date(str_date)
 
-    # Gets latest location from table
-    def _get_location(self, report):
+    @property
+    def location_history(self):
+        """Return known fixes, oldest first."""
+        return list(self._location_history)
 
+    # Gets latest location from table and merges fixes newer than the last
+    # report into the history. The server returns its whole history, newest
+    # first, so scanning stops where the newest fixes of the last report show
+    # up again instead of walking it all. Those are matched as a run, a
+    # single fix is ambiguous once the vehicle parks at a spot again.
+    def _get_location(self, report):
+        head = self._report_head
+        entries = []
+        newest = None
+        known_index = None
+        start = 0
         for r in report:
+            entries.append(r)
             if r.index == 0:
-                self.gps_position = r.location
-                return r.location
+                newest = r
+            if not head:
+                # Nothing merged yet, only the newest run is of interest
+                if newest is not None and len(entries) >= LOCATION_MATCH_RUN:
+                    break
+                continue
+            start = self._match_run(entries, start, head)
+            if newest is not None and len(entries) - start >= len(head):
+                known_index = start
+                break
+        else:
+            if head and start < len(entries):
+                # Overlap cut short by the end of the report
+                known_index = start
+
+        if newest is None:
+            return None
+
+        if not head:
+            fresh = [newest]
+            self._report_head = [r.location for r in entries[:LOCATION_MATCH_RUN]]
+        elif known_index is None:
+            # Gap since the last report, merge everything reported
+            fresh = entries
+            self._report_head = [r.location for r in entries[:LOCATION_MATCH_RUN]]
+        else:
+            fresh = entries[:known_index]
+            self._report_head = (
+                [r.location for r in fresh] + head)[:LOCATION_MATCH_RUN]
+        for r in reversed(fresh):
+            self._location_history.append(r.location)
+
+        self.gps_position = newest.location
+        return newest.location
+
+    # Returns the first position from start where the entries read so far
+    # match the head of the last report
+    @staticmethod
+    def _match_run(entries, start, head):
+        while start < len(entries):
+            run = entries[start:start + len(head)]
+            if all(r.location == location for r, location in zip(run, head)):
+                return start
+            start += 1
+        return start
 
     @Throttle(MIN_TIME_BETWEEN_UPDATES)
     def update(self, **kwargs):
-        """Fetch the latest status from OnStar."""
+        """Start fetching the latest status from OnStar.
+
+        Returns the Future of the refresh, or None when it was not scheduled.
+        """
         _LOGGER.info("Update onstar data.")
-        self._status = self._get_status()
+        # Blocking login and fetch run on the integration's own pool so a slow
+        # OnStar cloud ties up neither the caller nor Home Assistant's shared
+        # executor
+        try:
+            future = self._executor.submit(self._refresh, kwargs.get("wake"))
+        except RuntimeError as err:
+            # OnStarExecutorFull, or the pool already shut down
+            _LOGGER.warning("Skipping OnStar update: %s", err)
+            return None
+        future.add_done_callback(self._refresh_done)
+        _LOGGER.debug("OnStar executor stats: %s", self._executor.stats)
+        return future
+
+    def schedule_refresh(self):
+        """Revalidate the snapshot in the background if it is due.
+
+        Never blocks: entities keep reading the current snapshot while the
+        refresh runs on the OnStar pool.
+        """
+        with self._refresh_lock:
+            if self._revalidation is not None and not self._revalidation.done():
+                return
+            if (
+                self._attempted_at is not None
+                and time.monotonic() - self._attempted_at
+                < MIN_TIME_BETWEEN_UPDATES.total_seconds()
+            ):
+                return
+            try:
+                self._revalidation = self._executor.submit(self._refresh)
+            except RuntimeError as err:
+                # OnStarExecutorFull, or the pool already shut down
+                _LOGGER.debug("OnStar revalidation not scheduled: %s", err)
+                return
+            self._revalidation.add_done_callback(self._refresh_done)
+
+    # Nobody waits for a background refresh, its errors are reported here
+    def _refresh_done(self, future):
+        if future.cancelled():
+            return
+        err = future.exception()
+        if err is not None:
+            self._refresh_failed = True
+            _LOGGER.error(
+                "OnStar refresh failed", exc_info=(type(err), err, err.__traceback__))
+
+    def start_initial_fetch(self):
+        """Start the fetch shared by all platforms at boot, once."""
+        with self._refresh_lock:
+            if self._initial_fetch is None:
+                self._initial_fetch = self._executor.submit(self._refresh)
+                # Entity updates must not queue a second fetch meanwhile
+                self._revalidation = self._initial_fetch
+            return self._initial_fetch
+
+    def wait_for_initial_fetch(self, timeout=INITIAL_FETCH_TIMEOUT):
+        """Block until the initial fetch is done, or timeout seconds."""
+        try:
+            self.start_initial_fetch().result(timeout)
+        except concurrent.futures.TimeoutError:
+            _LOGGER.warning("Initial OnStar fetch still running after %d s", timeout)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error("Initial OnStar fetch failed: %s", err)
+
+    def restore(self, snapshots):
+        """Serve the newest persisted snapshot until the first refresh.
+
+        snapshots maps VIN to (epoch time, snapshot), as returned by
+        DeltaStore.restore.
+        """
+        if not snapshots or self._status is not None:
+            return
+        ts, status = max(snapshots.values(), key=lambda item: item[0])
+        if "onstar.localization" in status:
+            # Persisted as [latitude, longitude]
+            status["onstar.localization"] = coordinates(
+                status["onstar.localization"])
+        age = max(time.time() - ts, 0)
+        _LOGGER.info("Restored OnStar snapshot from %d s ago", age)
+        self._updated_at = time.monotonic() - age
+        self._refreshed_at = ts
+        self._last_changed = dict.fromkeys(status, ts)
+        self.gps_position = status.get("onstar.localization")
+        self._status = status
+        self._revision += 1
+        # Derived state starts from the restored snapshot as a whole
+        self._apply_changes(
+            status, {key: (None, value) for key, value in status.items()}, ts)
+        if self.parking is not None:
+            self.parking.add(
+                status.get("onstar.vin"), status.get("onstar.localization"),
+                status.get("onstar.ignition"), ts)
+
+    def _refresh(self, wake=None):
+        with self._refresh_running, self._profiler.cycle():
+            self._refresh_status(wake)
+
+    def _refresh_status(self, wake=None):
+        self._attempted_at = time.monotonic()
+        status = self._get_status(wake)
+        if status is None:
+            self._refresh_failed = True
+            if self._status is not None:
+                _LOGGER.warning(
+                    "OnStar refresh failed, serving snapshot from %d s ago",
+                    self.data_age)
+            return
+        self._updated_at = time.monotonic()
+        now = self._refreshed_at = time.time()
+        self._refresh_failed = False
+        if self.parking is not None:
+            # Dwell time grows with every fix, even an unchanged one
+            self.parking.add(
+                status.get("onstar.vin"), status.get("onstar.localization"),
+                status.get("onstar.ignition"), now)
+        if status is self._status:
+            return
+
+        previous = self._status or {}
+        changes = {}
+        for key, value in status.items():
+            if key not in previous or not _same(key, previous[key], value):
+                self._last_changed[key] = now
+                changes[key] = (previous.get(key), value)
+        self._status = status
+        self._revision += 1
+        self._apply_changes(status, changes, now)
+        if self._store is not None:
+            persisted = status
+            if "onstar.localization" in status:
+                # Whatever shape the fix came in, it is restored as coordinates
+                persisted = dict(status)
+                persisted["onstar.localization"] = coordinates(
+                    status["onstar.localization"])
+            self._store.record(status.get("onstar.vin"), persisted, now)
+        if changes:
+            self._subscriptions.publish(StatusChange(
+                status.get("onstar.vin"), self._revision, now, changes))
+
+    # Updates the state derived from the changed fields {field: (old, new)}
+    # of a new snapshot
+    def _apply_changes(self, status, changes, now):
+        if self._geocoder is not None and "onstar.localization" in changes:
+            self.address = self._geocoder.lookup(status.get("onstar.localization"))
+        if changes and self.fleet is not None:
+            self.fleet.update(status.get("onstar.vin"), changes, status, now)
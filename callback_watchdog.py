@@ -0,0 +1,180 @@
+"""
+Opt-in watchdog measuring how long integration callbacks hold their thread.
+
+Callbacks running longer than the threshold are logged with a sample of
+their stack, taken while they were still running, and the worst cases are
+kept for later inspection. A timer probe on Home Assistant's event loop
+does the same for whatever keeps the loop from running its timers on time.
+"""
+import heapq
+import itertools
+import logging
+import sys
+import threading
+import time
+import traceback
+import types
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+_LOGGER = logging.getLogger(__name__)
+
+WORST_CASES = 10
+LOOP_PROBE_INTERVAL = 1.0
+LOOP_PROBE_NAME = "event loop"
+
+
+class _Call:
+    __slots__ = ("name", "thread_id", "start", "stack")
+
+    def __init__(self, name, start=None):
+        self.name = name
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter() if start is None else start
+        self.stack = None
+
+
+class CallbackWatchdog:
+    """Measures callbacks and samples the stack of slow ones."""
+
+    def __init__(self, threshold, worst_cases=WORST_CASES):
+        self._threshold = threshold
+        self._worst_cases = worst_cases
+        self._lock = threading.Lock()
+        self._active = {}
+        self._ids = itertools.count()
+        # Min-heap of (duration, id, name, stack), smallest evicted first
+        self._worst = []
+        self._stop_event = threading.Event()
+        self._monitor = threading.Thread(
+            target=self._run, name="onstar_watchdog", daemon=True)
+        self._monitor.start()
+
+    def _run(self):
+        # Sampling at half the threshold catches every slow call in flight
+        while not self._stop_event.wait(self._threshold / 2):
+            now = time.perf_counter()
+            frames = None
+            with self._lock:
+                calls = list(self._active.values())
+            for call in calls:
+                if call.stack is not None or now - call.start < self._threshold:
+                    continue
+                if frames is None:
+                    frames = sys._current_frames()
+                frame = frames.get(call.thread_id)
+                if frame is not None:
+                    call.stack = "".join(traceback.format_stack(frame))
+
+    def _start(self, call):
+        call_id = next(self._ids)
+        with self._lock:
+            self._active[call_id] = call
+        return call_id
+
+    def _finish(self, call_id, call):
+        """Record call, return its duration if it exceeded the threshold."""
+        duration = time.perf_counter() - call.start
+        with self._lock:
+            del self._active[call_id]
+            if duration < self._threshold:
+                return None
+            entry = (duration, call_id, call.name, call.stack)
+            if len(self._worst) < self._worst_cases:
+                heapq.heappush(self._worst, entry)
+            else:
+                heapq.heappushpop(self._worst, entry)
+        return duration
+
+    @contextmanager
+    def measure(self, name):
+        """Measure the enclosed block as callback name."""
+        call = _Call(name)
+        call_id = self._start(call)
+        try:
+            yield
+        finally:
+            duration = self._finish(call_id, call)
+            if duration is not None:
+                _LOGGER.warning(
+                    "%s held its thread for %.3f s (threshold %.3f s)%s",
+                    name, duration, self._threshold,
+                    "\n" + call.stack if call.stack else "")
+
+    def watch(self, name, func):
+        """Wrap func so every call is measured."""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    @types.coroutine
+    def watch_coroutine(self, name, coro):
+        """Await coro, measuring each step it runs between suspensions.
+
+        Time spent suspended, waiting on the network, is not counted, only
+        the time the coroutine keeps its event loop busy.
+        """
+        value = error = None
+        while True:
+            with self.measure(name):
+                try:
+                    if error is None:
+                        future = coro.send(value)
+                    else:
+                        future = coro.throw(error)
+                except StopIteration as stop:
+                    return stop.value
+            value = error = None
+            try:
+                value = yield future
+            except BaseException as err:  # pylint: disable=broad-except
+                error = err
+
+    def probe_loop(self, loop, interval=LOOP_PROBE_INTERVAL):
+        """Measure how late a repeating timer fires on loop.
+
+        While the timer is overdue by more than the threshold, the stack of
+        the loop's thread is sampled, showing what holds the loop. May be
+        called from any thread.
+        """
+        loop.call_soon_threadsafe(self._arm_probe, loop, interval)
+
+    def _arm_probe(self, loop, interval):
+        # Runs on the loop: the call's thread is the loop's and it starts
+        # counting when the timer is due
+        if self._stop_event.is_set():
+            return
+        call = _Call(LOOP_PROBE_NAME, time.perf_counter() + interval)
+        loop.call_later(
+            interval, self._probe_fired, loop, interval, self._start(call), call)
+
+    def _probe_fired(self, loop, interval, call_id, call):
+        lag = self._finish(call_id, call)
+        if lag is not None:
+            _LOGGER.warning(
+                "Event loop ran its timers %.3f s late (threshold %.3f s)%s",
+                lag, self._threshold, "\n" + call.stack if call.stack else "")
+        self._arm_probe(loop, interval)
+
+    @property
+    def worst(self):
+        """Return the worst cases as (duration, name, stack), slowest first."""
+        with self._lock:
+            return [
+                (duration, name, stack)
+                for duration, _, name, stack in sorted(self._worst, reverse=True)
+            ]
+
+    def stop(self):
+        self._stop_event.set()
+        for duration, name, stack in self.worst:
+            _LOGGER.warning("Slow OnStar callback %s: %.3f s", name, duration)
+
+
+def measure(watchdog, name):
+    """Return watchdog.measure(name), or a no-op when watchdog is disabled."""
+    if watchdog is None:
+        return nullcontext()
+    return watchdog.measure(name)
@@ -0,0 +1,52 @@
+"""
+OnStar client with a cheap, cloud cache only refresh.
+"""
+import json
+
+from onstar.onstar import OnStar
+
+from .replay import _object_hook
+
+
+class OnStarClient(OnStar):
+    """onstar.OnStar able to skip waking the vehicle.
+
+    The diagnostics report is served from the last data the OnStar cloud
+    holds, while the PIN protected location query is answered by the
+    vehicle's telematics unit, which is slow and drains the 12 V battery.
+    Routine refreshes therefore skip it.
+
+    When given a session, requests go through it and it is left open, so
+    connections are reused across refreshes.
+    """
+
+    def __init__(self, username, password, pin, loop, session=None):
+        super().__init__(username, password, pin, loop)
+        self._shared_session = session
+
+    async def _login(self):
+        if self._shared_session is None:
+            await super()._login()
+            return
+
+        # Same as onstar.OnStar._login, minus creating a throwaway session
+        payload = {'username': self._username, 'password': self._password, 'roleCode': 'driver', 'place': ''}
+        self._session = self._shared_session
+        response = await self._session.post(self._LOGIN_URL, data=payload)
+        response_data = await response.text()
+        data = json.loads(response_data, object_hook=_object_hook)
+        self._login_object = data
+        self._token = data.results[0].token
+        self._header = {'X-GM-token': self._token}
+
+    async def refresh(self, wake=True):
+        self._location_object = None
+        await self._login()
+        try:
+            await self._login_info()
+            await self._diagnostics()
+            if wake:
+                await self._location()
+        finally:
+            if self._shared_session is None:
+                await self._session.close()
@@ -3,4 +3,57 @@ from datetime import timedelta
 
 DOMAIN = "onstar_component"
 ONSTAR_COMPONENTS = ["sensor", "device_tracker"]
+# Platforms and sensor types to set up, all by default
+CONF_PLATFORMS = "platforms"
+CONF_SENSORS = "sensors"
 MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=300)
+# Seconds platforms wait at boot for the shared initial fetch
+INITIAL_FETCH_TIMEOUT = 60
+
+# Routine refreshes wake a parked vehicle at most this often, 0 disables
+CONF_WAKE_INTERVAL = "wake_interval"
+DEFAULT_WAKE_INTERVAL = timedelta(hours=6)
+PARKED_IGNITION = (None, False, "OFF", "Off", "off")
+# Fields the device tracker and parking spots read, besides the location
+LOCATION_INPUTS = frozenset(("onstar.plate", "onstar.vin", "onstar.ignition"))
+
+# Last good snapshot is served for at most this long after refreshes fail
+CONF_MAX_STALENESS = "max_staleness"
+DEFAULT_MAX_STALENESS = timedelta(hours=1)
+
+# Pool for blocking OnStar I/O, see executor.py
+EXECUTOR_MAX_WORKERS = 2
+EXECUTOR_MAX_QUEUE = 4
+
+CONF_RECORD_DIR = "record_dir"
+# Recording retention, uncompressed bytes per file and rotated files kept
+CONF_RECORD_MAX_BYTES = "record_max_bytes"
+CONF_RECORD_BACKUP_COUNT = "record_backup_count"
+CONF_REPLAY_DIR = "replay_dir"
+CONF_REPLAY_SPEED = "replay_speed"
+
+# Number of location fixes kept in memory
+LOCATION_HISTORY_SIZE = 100
+# Newest fixes of a report remembered to find where the next one overlaps
+LOCATION_MATCH_RUN = 8
+
+# CSV place dataset for offline reverse geocoding, see geocode.py
+CONF_PLACES_FILE = "places_file"
+
+# Seconds a callback or update may hold its thread before it is reported
+CONF_WATCHDOG_THRESHOLD = "watchdog_threshold"
+
+# Changes buffered per subscriber, the oldest are dropped beyond this
+SUBSCRIPTION_QUEUE_SIZE = 16
+
+# Opt-in fleet wide sensors, see fleet.py. They count vehicles this many km
+# or less from maintenance as due
+CONF_FLEET_SENSORS = "fleet_sensors"
+CONF_MAINTENANCE_DISTANCE = "maintenance_distance"
+DEFAULT_MAINTENANCE_DISTANCE = 1000
+
+# Delta encoded state file restored at start, see persistence.py, and how
+# often buffered snapshots are written to it
+CONF_STATE_FILE = "state_file"
+CONF_FLUSH_INTERVAL = "flush_interval"
+DEFAULT_FLUSH_INTERVAL = timedelta(minutes=15)
@@ -3,6 +3,7 @@ import logging
 from homeassistant.helpers.event import track_utc_time_change
 from homeassistant.util import slugify
 
+from .callback_watchdog import measure
 from .const import DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
@@ -11,6 +12,7 @@ _LOGGER = logging.getLogger(__name__)
 def setup_scanner(hass, config, see, discovery_info=None):
 
     data = hass.data[DOMAIN]
+    data.wait_for_initial_fetch()
     tracker = OnstarDeviceTracker(see, data)
     _LOGGER.info("onstar device_tracker set-up")
     tracker.setup(hass)
@@ -26,17 +28,27 @@ class OnstarDeviceTracker:
 
     def setup(self, hass):
         """Set up a timer and start gathering devices."""
+        # Reports the position from the shared initial snapshot, no fetch
         self.update()
         track_utc_time_change(
-            hass, lambda now: self.update(), second=range(0, 60, 30)
+            hass, lambda now: self._timed_update(), second=range(0, 60, 30)
         )
 
+    def _timed_update(self) -> None:
+        with measure(self._data.watchdog, "device_tracker update"):
+            self.update()
+
 
     def update(self) -> None:
         """Update the device info.
         Only update the state in home assistant if tracking in
         the car is enabled.
         """
+        self._data.schedule_refresh()
+        if self._data.status is None or self._data.expired:
+            _LOGGER.debug("No recent OnStar data, skipping tracker update")
+            return
+
         dev_id = slugify(self._data.status['onstar.plate'])
 
         if self._data._pin is None:
@@ -45,6 +57,8 @@ class OnstarDeviceTracker:
 
         _LOGGER.info("Updating %s", dev_id)
         attrs = {"vin": self._data.status['onstar.vin']}
+        if self._data.parking is not None:
+            attrs.update(self._data.parking.attributes(attrs["vin"]))
         self._see(
             dev_id=dev_id,
             host_name=self._data.status['onstar.plate'],
@@ -0,0 +1,91 @@
+"""
+Extraction of sensor values from OnStar diagnostics reports.
+"""
+from datetime import datetime
+from typing import Any
+
+from .replay import _to_plain
+
+# Report sections with a dedicated sensor, others get on demand entities
+EXTRACTED_SECTIONS = ("airbag",)
+SECTION_SENSOR_PREFIX = "onstar.section."
+
+
+# Parses a report date such as 2019-10-16T10:54:52.535+02:00
+def parse_date(str_date):
+    return datetime.strptime(str_date, '%Y-%m-%dT%H:%M:%S.%f%z')
+
+
+# Formats date from 2019-10-16T10:54:52.535+02:00 to human readable
+def get_date(str_date):
+    return parse_date(str_date).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _metrics(result):
+    return result.reportData.metrics
+
+
+def _maintenance(result):
+    return result.reportData.maintenance
+
+
+# Sensor type -> value extracted from a diagnostics report result
+FIELD_EXTRACTORS = {
+    "onstar.plate": lambda r: r.vehicle.licensePlate,
+    "onstar.vin": lambda r: r.vehicle.vehicleVIN,
+    "onstar.laststatus": lambda r: get_date(r.updatedOn),
+    "onstar.warningcount": lambda r: r.warningCount,
+    "onstar.errorcount": lambda r: r.errorCount,
+    "onstar.oillife": lambda r: round(_metrics(r).oilLife*100,1),
+    "onstar.fuellevel": lambda r: int(round(_metrics(r).fuelLevel*100)),
+    "onstar.range": lambda r: int(round(_metrics(r).fuelRange)),
+    "onstar.ignition": lambda r: _metrics(r).ignition,
+    "onstar.odometer": lambda r: int(round(_metrics(r).odometer)),
+    "onstar.tirelf": lambda r: _metrics(r).tirePressureLf,
+    "onstar.tirelr": lambda r: _metrics(r).tirePressureLr,
+    "onstar.tirerf": lambda r: _metrics(r).tirePressureRf,
+    "onstar.tirerr": lambda r: _metrics(r).tirePressureRr,
+    "onstar.tirestatuslf": lambda r: _metrics(r).tireStatusLf=="GREEN",
+    "onstar.tirestatuslr": lambda r: _metrics(r).tireStatusLr=="GREEN",
+    "onstar.tirestatusrf": lambda r: _metrics(r).tireStatusRf=="GREEN",
+    "onstar.tirestatusrr": lambda r: _metrics(r).tireStatusRr=="GREEN",
+    "onstar.tiresetting": lambda r: _metrics(r).placardSetting,
+    "onstar.ftirepressure": lambda r: _metrics(r).placardFront,
+    "onstar.rtirepressure": lambda r: _metrics(r).placardRear,
+    "onstar.nextmaindate": lambda r: _maintenance(r).nextMaintDate,
+    "onstar.nextmainodo": lambda r: int(round(_maintenance(r).nextMaintOdometer)),
+    "onstar.airbagok": lambda r: r.reportData.sections.airbag.status=="GREEN",
+}
+
+
+# Builds sensor values from a single diagnostics report result, limited to
+# fields when given
+def extract_status(result, fields=None):
+    v: dict[str, Any] = {}
+    for key, extract in FIELD_EXTRACTORS.items():
+        if fields is None or key in fields:
+            v[key] = extract(result)
+    return v
+
+
+# Lists the report sections without a dedicated sensor
+def section_names(result):
+    sections = getattr(result.reportData, "sections", None)
+    return [
+        name for name in getattr(sections, "_fields", ())
+        if name not in EXTRACTED_SECTIONS
+    ]
+
+
+# Decodes a single report section into a plain dict, None if missing
+def decode_section(result, name):
+    section = getattr(result.reportData.sections, name, None)
+    return None if section is None else _to_plain(section)
+
+
+# Gets the latest fix from a location report
+def latest_location(report):
+    for r in report:
+        if r.index == 0:
+            return r.location
+    return None
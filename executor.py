@@ -0,0 +1,105 @@
+"""
+Dedicated thread pool for blocking OnStar I/O.
+
+Logging in and fetching reports can take tens of seconds when the OnStar
+cloud is slow. Running that work on Home Assistant's shared executor would
+starve unrelated integrations, so it is isolated on a small named pool with
+a bounded queue.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .const import EXECUTOR_MAX_QUEUE, EXECUTOR_MAX_WORKERS
+
+_LOGGER = logging.getLogger(__name__)
+
+THREAD_NAME_PREFIX = "onstar"
+
+
+class OnStarExecutorFull(RuntimeError):
+    """Raised when the OnStar pool has no free slot for another job."""
+
+
+class OnStarExecutor:
+    """Bounded thread pool with queue-depth metrics."""
+
+    def __init__(self, max_workers=EXECUTOR_MAX_WORKERS,
+                 max_queue=EXECUTOR_MAX_QUEUE):
+        self._max_workers = max_workers
+        self._max_queue = max_queue
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=THREAD_NAME_PREFIX)
+        # Running plus queued jobs can never exceed workers + queue size
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._max_queue_depth = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn on the pool and return its Future."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise OnStarExecutorFull(
+                "%d OnStar jobs already pending" % (
+                    self._max_workers + self._max_queue))
+
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queued)
+
+        try:
+            return self._pool.submit(self._run, fn, args, kwargs)
+        except RuntimeError:
+            # Pool already shut down
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._failed += 1
+            raise
+        else:
+            with self._lock:
+                self._completed += 1
+            return result
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    @property
+    def stats(self):
+        """Return a snapshot of the pool metrics."""
+        with self._lock:
+            return {
+                "max_workers": self._max_workers,
+                "max_queue": self._max_queue,
+                "active": self._active,
+                "queue_depth": self._queued,
+                "max_queue_depth": self._max_queue_depth,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait=False):
+        """Stop accepting jobs and release the worker threads."""
+        _LOGGER.debug("Shutting down OnStar executor: %s", self.stats)
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,154 @@
+"""
+Streaming export of recorded vehicle history.
+
+Rows are produced by generators straight from the recordings on disk and
+written in chunks, so memory use does not depend on the exported range.
+"""
+import csv
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+from .diagnostics import extract_status, latest_location
+from .geocode import coordinates
+from .replay import (
+    KIND_DIAGNOSTICS,
+    KIND_LOCATION,
+    _object_hook,
+    _to_plain,
+    read_records,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+EXPORT_FORMATS = [FORMAT_NDJSON, FORMAT_CSV]
+
+CHUNK_SIZE = 500
+
+LOCATION_FIELD = "onstar.localization"
+
+
+def _response(data):
+    return json.loads(json.dumps(data), object_hook=_object_hook)
+
+
+def _record_vin(data):
+    # Read straight from the raw record, without decoding the report
+    return data["results"][0]["vehicle"]["vehicleVIN"]
+
+
+def iter_history(records, start=None, end=None, fields=None, vin=None):
+    """Yield one row per recorded snapshot or position.
+
+    Rows are dicts with "time" (ISO 8601, UTC), "vin" and the selected
+    fields. start and end are epoch seconds, fields a collection of sensor
+    keys (all when None).
+    """
+    current_vin = None
+    for record in records:
+        ts = record["ts"]
+        # Cheap filters first, records are time ordered. Reports outside
+        # the range or of another vehicle only update the current VIN.
+        if end is not None and ts > end:
+            return
+        skipped = start is not None and ts < start
+        if record["kind"] == KIND_DIAGNOSTICS:
+            try:
+                current_vin = _record_vin(record["data"])
+            except (IndexError, KeyError, TypeError) as err:
+                _LOGGER.debug("Skipping unreadable report at %s: %s", ts, err)
+                continue
+            if skipped or (vin is not None and current_vin != vin):
+                continue
+            try:
+                values = extract_status(
+                    _response(record["data"]).results[0], fields)
+            except (AttributeError, IndexError, TypeError, ValueError) as err:
+                _LOGGER.debug("Skipping unreadable report at %s: %s", ts, err)
+                continue
+        elif record["kind"] == KIND_LOCATION:
+            if skipped or (vin is not None and current_vin != vin) or (
+                    fields is not None and LOCATION_FIELD not in fields):
+                continue
+            try:
+                location = latest_location(_response(record["data"]).results)
+            except (AttributeError, TypeError) as err:
+                _LOGGER.debug("Skipping unreadable location at %s: %s", ts, err)
+                continue
+            # [latitude, longitude] whatever shape the fix came in
+            location = coordinates(location)
+            values = {LOCATION_FIELD: None if location is None else list(location)}
+        else:
+            continue
+
+        row = {
+            "time": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+            "vin": current_vin,
+        }
+        row.update((key, _to_plain(value)) for key, value in values.items())
+        if len(row) > 2:
+            yield row
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_ndjson(rows, fp, chunk_size=CHUNK_SIZE):
+    count = 0
+    for chunk in _chunks(rows, chunk_size):
+        fp.write("".join(
+            json.dumps(row, separators=(",", ":")) + "\n" for row in chunk))
+        count += len(chunk)
+    return count
+
+
+def write_csv(rows, fp, columns, chunk_size=CHUNK_SIZE):
+    writer = csv.DictWriter(
+        fp, fieldnames=["time", "vin"] + list(columns), extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows(
+            {
+                key: json.dumps(value) if isinstance(value, (list, dict)) else value
+                for key, value in row.items()
+            }
+            for row in chunk
+        )
+        count += len(chunk)
+    return count
+
+
+def export_history(directory, path, fmt=FORMAT_NDJSON, start=None, end=None,
+                   fields=None, vin=None, columns=None):
+    """Export recorded history to path and return the number of rows.
+
+    The file is written next to its destination and moved in place once
+    complete, so a failed export never leaves a partial file behind.
+    """
+    rows = iter_history(read_records(directory), start, end, fields, vin)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as fp:
+            if fmt == FORMAT_CSV:
+                count = write_csv(rows, fp, fields or columns or [])
+            else:
+                count = write_ndjson(rows, fp)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _LOGGER.info("Exported %d OnStar history rows to %s", count, path)
+    return count
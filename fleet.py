@@ -0,0 +1,176 @@
+"""
+Fleet wide aggregates over the per vehicle snapshots.
+
+Aggregates are maintained from the changed fields of each refresh, so an
+update costs O(1) per changed field (O(log n) for the lowest fuel heap)
+instead of a scan over every vehicle.
+"""
+import heapq
+import threading
+import time
+from datetime import datetime
+
+from .const import DEFAULT_MAINTENANCE_DISTANCE
+
+FLEET_LOWEST_FUEL = "fleet.lowestfuel"
+FLEET_WARNINGS = "fleet.warnings"
+FLEET_TIRE_ALERTS = "fleet.tirealerts"
+FLEET_DAILY_DISTANCE = "fleet.dailydistance"
+FLEET_MAINTENANCE_DUE = "fleet.maintenancedue"
+FLEET_SENSOR_TYPES = {
+    FLEET_LOWEST_FUEL: ['Fleet lowest fuel level', '%', 'mdi:gas-station'],
+    FLEET_WARNINGS: ['Vehicles with warnings', '', 'mdi:account-alert'],
+    FLEET_TIRE_ALERTS: ['Vehicles with tire alerts', '', 'mdi:car-tire-alert'],
+    FLEET_DAILY_DISTANCE: ['Fleet distance today', 'km', 'mdi:map-marker-distance'],
+    FLEET_MAINTENANCE_DUE: ['Vehicles due for maintenance', '', 'mdi:wrench'],
+}
+
+TIRE_STATUS_FIELDS = (
+    "onstar.tirestatuslf",
+    "onstar.tirestatuslr",
+    "onstar.tirestatusrf",
+    "onstar.tirestatusrr",
+)
+# Snapshot fields the aggregates are computed from
+FLEET_INPUTS = frozenset(TIRE_STATUS_FIELDS + (
+    "onstar.fuellevel",
+    "onstar.warningcount",
+    "onstar.odometer",
+    "onstar.nextmainodo",
+))
+
+
+class FleetAggregator:
+    """Keeps fleet aggregates up to date from per vehicle changes."""
+
+    def __init__(self, maintenance_distance=DEFAULT_MAINTENANCE_DISTANCE):
+        self._maintenance_distance = maintenance_distance
+        self._lock = threading.Lock()
+
+        # Lowest fuel: heap of (level, vin), stale entries skipped lazily
+        self._fuel: dict[str, int] = {}
+        self._fuel_heap: list[tuple[int, str]] = []
+
+        # Vehicles with warnings, with a non-GREEN tire, due for maintenance
+        self._warned: set[str] = set()
+        self._tire_alerts: dict[str, int] = {}
+        self._due: set[str] = set()
+
+        # Distance today: per vehicle odometer before the day started
+        self._day = None
+        self._day_start: dict[str, float] = {}
+        self._odometer: dict[str, float] = {}
+        self._daily_distance = 0
+
+    def update(self, vin, changes, status, now):
+        """Apply the changes {field: (old, new)} of vehicle vin.
+
+        status is the vehicle's full new snapshot, now the epoch time.
+        """
+        with self._lock:
+            if "onstar.fuellevel" in changes:
+                self._update_fuel(vin, status.get("onstar.fuellevel"))
+            if "onstar.warningcount" in changes:
+                self._update_member(
+                    self._warned, vin, (status.get("onstar.warningcount") or 0) > 0)
+            for field in TIRE_STATUS_FIELDS:
+                if field in changes:
+                    self._update_tire(vin, changes[field])
+            if "onstar.odometer" in changes or "onstar.nextmainodo" in changes:
+                self._update_due(vin, status)
+            self._update_distance(vin, status.get("onstar.odometer"), now)
+
+    def _update_fuel(self, vin, level):
+        if level is None:
+            self._fuel.pop(vin, None)
+            return
+        self._fuel[vin] = level
+        heapq.heappush(self._fuel_heap, (level, vin))
+        if len(self._fuel_heap) > 2 * len(self._fuel) + 16:
+            self._fuel_heap = [(level, vin) for vin, level in self._fuel.items()]
+            heapq.heapify(self._fuel_heap)
+
+    @staticmethod
+    def _update_member(members, vin, member):
+        if member:
+            members.add(vin)
+        else:
+            members.discard(vin)
+
+    def _update_tire(self, vin, values):
+        # Tire status fields are True when GREEN
+        old, new = values
+        alerts = self._tire_alerts.get(vin, 0) + (new is False) - (old is False)
+        if alerts > 0:
+            self._tire_alerts[vin] = alerts
+        else:
+            self._tire_alerts.pop(vin, None)
+
+    def _update_due(self, vin, status):
+        odometer = status.get("onstar.odometer")
+        next_odometer = status.get("onstar.nextmainodo")
+        self._update_member(
+            self._due, vin,
+            None not in (odometer, next_odometer)
+            and next_odometer - odometer <= self._maintenance_distance)
+
+    def _roll_day(self, now):
+        day = datetime.fromtimestamp(now).date()
+        if self._day is not None and day < self._day:
+            # Late report of a past day
+            return
+        if day != self._day:
+            # Vehicles start the day at their last known odometer
+            self._day = day
+            self._day_start = {}
+            self._daily_distance = 0
+
+    def _update_distance(self, vin, odometer, now):
+        if odometer is None:
+            return
+        self._roll_day(now)
+        last = self._odometer.get(vin)
+        self._odometer[vin] = odometer
+        start = self._day_start.setdefault(vin, odometer if last is None else last)
+        previous = 0 if last is None else max(last - start, 0)
+        self._daily_distance += max(odometer - start, 0) - previous
+
+    @property
+    def lowest_fuel(self):
+        """Return (level, vin) of the vehicle lowest on fuel, or None."""
+        with self._lock:
+            heap = self._fuel_heap
+            while heap and self._fuel.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            return heap[0] if heap else None
+
+    @property
+    def values(self):
+        """Return the fleet sensor values."""
+        lowest = self.lowest_fuel
+        with self._lock:
+            # No report may have come in since midnight
+            self._roll_day(time.time())
+            return {
+                FLEET_LOWEST_FUEL: None if lowest is None else lowest[0],
+                FLEET_WARNINGS: len(self._warned),
+                FLEET_TIRE_ALERTS: len(self._tire_alerts),
+                FLEET_DAILY_DISTANCE: self._daily_distance,
+                FLEET_MAINTENANCE_DUE: len(self._due),
+            }
+
+    @property
+    def attributes(self):
+        """Return the vehicles behind each fleet sensor value."""
+        lowest = self.lowest_fuel
+        with self._lock:
+            return {
+                FLEET_LOWEST_FUEL: {"vin": None if lowest is None else lowest[1]},
+                FLEET_WARNINGS: {"vins": sorted(self._warned)},
+                FLEET_TIRE_ALERTS: {"vins": sorted(self._tire_alerts)},
+                FLEET_DAILY_DISTANCE: {"vehicles": len(self._odometer)},
+                FLEET_MAINTENANCE_DUE: {
+                    "vins": sorted(self._due),
+                    "distance": self._maintenance_distance,
+                },
+            }
@@ -0,0 +1,137 @@
+"""
+Maintenance forecasting from odometer and oil life trends.
+
+Each vehicle keeps a running least squares fit of odometer and oil life
+against time. A snapshot updates the fits in constant time and memory, no
+history is stored or reprocessed.
+"""
+import logging
+from datetime import datetime, timedelta
+
+_LOGGER = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+# Fits spanning less time than this are too noisy to forecast from
+MIN_SPAN_DAYS = 1
+# An oil life increase above this many points is an oil change
+OIL_RESET_MARGIN = 5
+
+FORECAST_DISTANCE_PER_DAY = "onstar.distanceperday"
+FORECAST_NEXT_MAINTENANCE = "onstar.nextmainforecast"
+FORECAST_OIL_DEPLETION = "onstar.oildepletionforecast"
+# Snapshot fields the forecasts are computed from
+FORECAST_INPUTS = frozenset(
+    ("onstar.odometer", "onstar.oillife", "onstar.nextmainodo"))
+FORECAST_TYPES = {
+    FORECAST_DISTANCE_PER_DAY: ['Distance per day', 'km', 'mdi:chart-line'],
+    FORECAST_NEXT_MAINTENANCE: ['Next maintenance forecast', None, 'mdi:calendar-clock'],
+    FORECAST_OIL_DEPLETION: ['Oil life depletion forecast', None, 'mdi:oil'],
+}
+
+
+class LinearTrend:
+    """Incremental least squares fit of y against x.
+
+    Means and co-moments are updated Welford style, which stays accurate
+    for long runs of samples, x being kept relative to the first sample.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget all samples."""
+        self.count = 0
+        self._origin = None
+        self._last_x = None
+        self._mean_x = 0.0
+        self._mean_y = 0.0
+        self._cxx = 0.0
+        self._cxy = 0.0
+
+    def add(self, x, y):
+        """Add a sample, samples must come in increasing x."""
+        if self._origin is None:
+            self._origin = x
+        x -= self._origin
+        if self._last_x is not None and x <= self._last_x:
+            return
+        self._last_x = x
+        self.count += 1
+        dx = x - self._mean_x
+        self._mean_x += dx / self.count
+        self._mean_y += (y - self._mean_y) / self.count
+        self._cxx += dx * (x - self._mean_x)
+        self._cxy += dx * (y - self._mean_y)
+
+    @property
+    def span(self):
+        """Return the x range covered by the samples."""
+        return self._last_x or 0
+
+    @property
+    def slope(self):
+        """Return the fitted slope, None with fewer than two samples."""
+        if self.count < 2 or not self._cxx:
+            return None
+        return self._cxy / self._cxx
+
+
+class _VehicleTrends:
+    def __init__(self):
+        self.distance = LinearTrend()
+        self.oil = LinearTrend()
+        self.last_oil = None
+
+
+def _forecast_date(when, days):
+    if days is None:
+        return None
+    return (when + timedelta(days=max(days, 0))).date().isoformat()
+
+
+class MaintenanceForecaster:
+    """Forecasts maintenance dates per vehicle from its snapshots."""
+
+    def __init__(self, min_span=MIN_SPAN_DAYS):
+        self._min_span = min_span
+        self._vehicles: dict[str, _VehicleTrends] = {}
+
+    def add(self, status, when: datetime):
+        """Feed a snapshot taken at when and return the forecast values."""
+        trends = self._vehicles.setdefault(status.get("onstar.vin"), _VehicleTrends())
+        day = when.timestamp() / SECONDS_PER_DAY
+
+        odometer = status.get("onstar.odometer")
+        if odometer is not None:
+            trends.distance.add(day, odometer)
+
+        oil = status.get("onstar.oillife")
+        if oil is not None:
+            if trends.last_oil is not None and oil > trends.last_oil + OIL_RESET_MARGIN:
+                _LOGGER.debug("Oil life went up to %s%%, restarting its trend", oil)
+                trends.oil.reset()
+            trends.last_oil = oil
+            trends.oil.add(day, oil)
+
+        per_day = self._rate(trends.distance)
+        next_odometer = status.get("onstar.nextmainodo")
+        due_in = None
+        if per_day and per_day > 0 and None not in (odometer, next_odometer):
+            due_in = (next_odometer - odometer) / per_day
+
+        oil_per_day = self._rate(trends.oil)
+        oil_in = None
+        if oil_per_day and oil_per_day < 0:
+            oil_in = oil / -oil_per_day
+
+        return {
+            FORECAST_DISTANCE_PER_DAY: None if per_day is None else round(per_day, 1),
+            FORECAST_NEXT_MAINTENANCE: _forecast_date(when, due_in),
+            FORECAST_OIL_DEPLETION: _forecast_date(when, oil_in),
+        }
+
+    def _rate(self, trend):
+        if trend.span < self._min_span:
+            return None
+        return trend.slope
@@ -0,0 +1,124 @@
+"""
+Offline reverse geocoding against a user provided place dataset.
+
+The dataset is a CSV file with a header row and at least the columns
+name, latitude and longitude. An optional address column is used as the
+readable address, the name otherwise.
+"""
+import csv
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+_LOGGER = logging.getLogger(__name__)
+
+# Index cells of about 5 km, nearest place is searched in the 3x3 block
+INDEX_CELL_SIZE = 0.05
+# Lookups are cached per cell of about 100 m
+CACHE_PRECISION = 3
+CACHE_SIZE = 256
+CACHE_TTL = 24 * 3600
+MAX_DISTANCE = 2000
+
+EARTH_RADIUS = 6371000
+
+
+def coordinates(location):
+    """Return (latitude, longitude) of an OnStar location, or None."""
+    if location is None:
+        return None
+    for lat_attr, lon_attr in (("latitude", "longitude"), ("lat", "lon")):
+        if hasattr(location, lat_attr) and hasattr(location, lon_attr):
+            return float(getattr(location, lat_attr)), float(getattr(location, lon_attr))
+    try:
+        lat, lon = location[0], location[1]
+        return float(lat), float(lon)
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Return the great circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (math.sin(dphi / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+def _cell(lat, lon):
+    return (math.floor(lat / INDEX_CELL_SIZE), math.floor(lon / INDEX_CELL_SIZE))
+
+
+class ReverseGeocoder:
+    """Finds the nearest known place for a coordinate without network access."""
+
+    def __init__(self, places, max_distance=MAX_DISTANCE, cache_size=CACHE_SIZE,
+                 ttl=CACHE_TTL):
+        self._max_distance = max_distance
+        self._cache_size = cache_size
+        self._ttl = ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._index = {}
+        for lat, lon, address in places:
+            self._index.setdefault(_cell(lat, lon), []).append((lat, lon, address))
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        """Build a geocoder from a CSV place dataset."""
+        places = []
+        with open(path, newline="", encoding="utf-8") as fp:
+            for row in csv.DictReader(fp):
+                try:
+                    lat = float(row["latitude"])
+                    lon = float(row["longitude"])
+                except (KeyError, TypeError, ValueError):
+                    _LOGGER.debug("Skipping place without coordinates: %s", row)
+                    continue
+                places.append((lat, lon, row.get("address") or row.get("name")))
+        _LOGGER.info("Loaded %d places for reverse geocoding", len(places))
+        return cls(places, **kwargs)
+
+    def _nearest(self, lat, lon):
+        best = None
+        best_distance = self._max_distance
+        cell_lat, cell_lon = _cell(lat, lon)
+        for dlat in (-1, 0, 1):
+            for dlon in (-1, 0, 1):
+                for place in self._index.get((cell_lat + dlat, cell_lon + dlon), ()):
+                    d = distance(lat, lon, place[0], place[1])
+                    if d <= best_distance:
+                        best, best_distance = place[2], d
+        return best
+
+    def lookup(self, location):
+        """Return the readable address of location, or None."""
+        coords = coordinates(location)
+        if coords is None:
+            return None
+        key = (round(coords[0], CACHE_PRECISION), round(coords[1], CACHE_PRECISION))
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        # Resolved on the cell center so every point of a cell shares the result
+        address = self._nearest(*key)
+        with self._lock:
+            self._cache[key] = (now + self._ttl, address)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return address
@@ -0,0 +1,140 @@
+"""
+Online clustering of parking locations into frequent spots.
+
+Every vehicle keeps at most MAX_SPOTS spots. A fix taken while the ignition
+is off joins the nearest spot within SPOT_RADIUS, moving its center, or
+takes the place of the least visited spot. Nothing else is stored, so memory
+stays constant and history is never reprocessed.
+"""
+import threading
+import time
+
+from .const import PARKED_IGNITION
+from .geocode import coordinates, distance
+
+MAX_SPOTS = 16
+# Fixes closer than this to a spot's center, in meters, belong to it
+SPOT_RADIUS = 150
+# Spots visited this often are suggested as zones
+MIN_ZONE_VISITS = 3
+
+
+class _Spot:
+    __slots__ = ("number", "latitude", "longitude", "visits", "dwell", "last_visit")
+
+    def __init__(self, number, latitude, longitude, now):
+        self.number = number
+        self.latitude = latitude
+        self.longitude = longitude
+        self.visits = 0
+        self.dwell = 0.0
+        self.last_visit = now
+
+    @property
+    def name(self):
+        return "Parking %d" % self.number
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "latitude": round(self.latitude, 6),
+            "longitude": round(self.longitude, 6),
+            "radius": SPOT_RADIUS,
+            "visits": self.visits,
+            "dwell_hours": round(self.dwell / 3600, 1),
+        }
+
+
+class _VehicleSpots:
+    def __init__(self):
+        self.spots: list[_Spot] = []
+        self.parked: _Spot | None = None
+        self.sampled_at = None
+        self.next_number = 1
+
+
+class ParkingClusterer:
+    """Learns where each vehicle usually parks."""
+
+    def __init__(self, max_spots=MAX_SPOTS, radius=SPOT_RADIUS,
+                 min_visits=MIN_ZONE_VISITS):
+        self._max_spots = max_spots
+        self._radius = radius
+        self._min_visits = min_visits
+        self._lock = threading.Lock()
+        self._vehicles: dict[str, _VehicleSpots] = {}
+
+    def add(self, vin, location, ignition, now=None):
+        """Feed the fix and ignition state of a refresh."""
+        now = time.time() if now is None else now
+        coords = coordinates(location)
+        with self._lock:
+            vehicle = self._vehicles.setdefault(vin, _VehicleSpots())
+            if ignition not in PARKED_IGNITION or coords is None:
+                vehicle.parked = None
+                vehicle.sampled_at = None
+                return
+
+            spot = vehicle.parked
+            if spot is not None and distance(
+                    spot.latitude, spot.longitude, *coords) <= self._radius:
+                # Still parked at the same spot
+                spot.dwell += now - vehicle.sampled_at
+            else:
+                spot = self._visit(vehicle, coords, now)
+            vehicle.parked = spot
+            vehicle.sampled_at = now
+
+    def _visit(self, vehicle, coords, now):
+        nearest = None
+        nearest_distance = self._radius
+        for spot in vehicle.spots:
+            d = distance(spot.latitude, spot.longitude, *coords)
+            if d <= nearest_distance:
+                nearest, nearest_distance = spot, d
+
+        if nearest is None:
+            nearest = _Spot(vehicle.next_number, coords[0], coords[1], now)
+            if len(vehicle.spots) >= self._max_spots:
+                # Rare spots make room for new ones, frequent ones stay
+                evicted = min(
+                    vehicle.spots, key=lambda spot: (spot.visits, spot.last_visit))
+                vehicle.spots.remove(evicted)
+                nearest.number = evicted.number
+            else:
+                vehicle.next_number += 1
+            vehicle.spots.append(nearest)
+
+        nearest.visits += 1
+        nearest.last_visit = now
+        # Running mean of the visit fixes
+        nearest.latitude += (coords[0] - nearest.latitude) / nearest.visits
+        nearest.longitude += (coords[1] - nearest.longitude) / nearest.visits
+        return nearest
+
+    def parked_at(self, vin):
+        """Return the spot the vehicle is parked at, or None."""
+        with self._lock:
+            vehicle = self._vehicles.get(vin)
+            if vehicle is None or vehicle.parked is None:
+                return None
+            return vehicle.parked.as_dict()
+
+    def suggested_zones(self, vin):
+        """Return the frequent spots of the vehicle, most visited first."""
+        with self._lock:
+            vehicle = self._vehicles.get(vin)
+            if vehicle is None:
+                return []
+            spots = sorted(
+                (spot for spot in vehicle.spots if spot.visits >= self._min_visits),
+                key=lambda spot: spot.visits, reverse=True)
+            return [spot.as_dict() for spot in spots]
+
+    def attributes(self, vin):
+        """Return the device tracker attributes of the vehicle."""
+        parked = self.parked_at(vin)
+        return {
+            "parked_at": None if parked is None else parked["name"],
+            "suggested_zones": self.suggested_zones(vin),
+        }
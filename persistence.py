@@ -0,0 +1,181 @@
+"""
+Delta encoded, write coalesced persistence of vehicle snapshots.
+
+The state file is NDJSON, one line per persisted snapshot:
+{"ts": <epoch seconds>, "vin": ..., "full": true, "data": {...}} for a
+checkpoint, {"ts": ..., "vin": ..., "data": {<changed fields>}} otherwise.
+A line torn by a power loss is cut off on restore, before anything gets
+appended to it. Snapshots are buffered in memory and written by flush() with a single
+append and fsync, so disk writes follow what changed, not how often the
+vehicle is polled. The file is compacted to one checkpoint per vehicle
+once it grows past max_bytes.
+"""
+import json
+import logging
+import os
+import threading
+
+from .replay import _to_plain
+
+_LOGGER = logging.getLogger(__name__)
+
+# A vehicle gets a full snapshot every CHECKPOINT_EVERY records
+CHECKPOINT_EVERY = 50
+DEFAULT_MAX_BYTES = 1024 * 1024
+READ_BLOCK = 4096
+
+
+class DeltaStore:
+    """Persists per vehicle snapshots as deltas against the previous one."""
+
+    def __init__(self, path, checkpoint_every=CHECKPOINT_EVERY,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self._path = path
+        self._checkpoint_every = checkpoint_every
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending: list[str] = []
+        # Per vehicle last recorded (ts, snapshot) and records since its
+        # checkpoint
+        self._state: dict[str, tuple[float, dict]] = {}
+        self._since_checkpoint: dict[str, int] = {}
+        self.writes = 0
+
+    def restore(self):
+        """Read the state file and return {vin: (ts, snapshot)}."""
+        self._truncate_torn_tail()
+        restored = {}
+        for record in self._read():
+            vin = record.get("vin")
+            if record.get("full") or vin not in restored:
+                snapshot = dict(record["data"])
+                self._since_checkpoint[vin] = 0
+            else:
+                snapshot = restored[vin][1]
+                snapshot.update(record["data"])
+                for key in record.get("removed", ()):
+                    snapshot.pop(key, None)
+                self._since_checkpoint[vin] += 1
+            restored[vin] = (record["ts"], snapshot)
+        with self._lock:
+            self._state = {
+                vin: (ts, dict(snapshot)) for vin, (ts, snapshot) in restored.items()
+            }
+        return restored
+
+    def _truncate_torn_tail(self):
+        # Appends must start on a fresh line, or the first record after a
+        # power loss would be glued to the torn one and lost with it
+        try:
+            fp = open(self._path, "rb+")
+        except FileNotFoundError:
+            return
+        with fp:
+            end = fp.seek(0, os.SEEK_END)
+            if not end:
+                return
+            fp.seek(end - 1)
+            if fp.read(1) == b"\n":
+                return
+            while end > 0:
+                start = max(end - READ_BLOCK, 0)
+                fp.seek(start)
+                newline = fp.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            _LOGGER.warning(
+                "Dropping torn last record of OnStar state file %s", self._path)
+            fp.truncate(end)
+
+    def _read(self):
+        try:
+            fp = open(self._path, encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with fp:
+            for line in fp:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Torn last line after a power loss
+                    _LOGGER.debug("Skipping unreadable state record")
+
+    def record(self, vin, snapshot, ts):
+        """Buffer snapshot of vehicle vin, taken at ts, for the next flush."""
+        snapshot = {key: _to_plain(value) for key, value in snapshot.items()}
+        with self._lock:
+            previous = self._state.get(vin, (None, None))[1]
+            count = self._since_checkpoint.get(vin, 0)
+            if previous is None or count + 1 >= self._checkpoint_every:
+                record = {"ts": ts, "vin": vin, "full": True, "data": snapshot}
+                self._since_checkpoint[vin] = 0
+            else:
+                changed = {
+                    key: value for key, value in snapshot.items()
+                    if key not in previous or previous[key] != value
+                }
+                removed = [key for key in previous if key not in snapshot]
+                if not changed and not removed:
+                    return
+                record = {"ts": ts, "vin": vin, "data": changed}
+                if removed:
+                    record["removed"] = removed
+                self._since_checkpoint[vin] = count + 1
+            self._state[vin] = (ts, snapshot)
+            self._pending.append(json.dumps(record, separators=(",", ":")) + "\n")
+
+    @property
+    def pending(self):
+        """Return the number of buffered records."""
+        return len(self._pending)
+
+    def flush(self):
+        """Write buffered records with one append and fsync."""
+        with self._write_lock:
+            with self._lock:
+                lines, self._pending = self._pending, []
+                if not lines:
+                    return
+                state = dict(self._state)
+            try:
+                if self._size() + sum(map(len, lines)) > self._max_bytes:
+                    self._compact(state)
+                else:
+                    self._append("".join(lines))
+            except OSError as err:
+                _LOGGER.error("Unable to persist OnStar state: %s", err)
+                with self._lock:
+                    self._pending[:0] = lines
+
+    def _size(self):
+        try:
+            return os.path.getsize(self._path)
+        except OSError:
+            return 0
+
+    def _append(self, data):
+        with open(self._path, "a", encoding="utf-8") as fp:
+            fp.write(data)
+            fp.flush()
+            os.fsync(fp.fileno())
+        self.writes += 1
+
+    def _compact(self, state):
+        # The current state already includes every buffered record
+        _LOGGER.debug("Compacting OnStar state file %s", self._path)
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            for vin, (ts, snapshot) in state.items():
+                fp.write(json.dumps(
+                    {"ts": ts, "vin": vin, "full": True, "data": snapshot},
+                    separators=(",", ":")) + "\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, self._path)
+        with self._lock:
+            for vin in state:
+                self._since_checkpoint[vin] = 0
+        self.writes += 1
@@ -0,0 +1,207 @@
+"""
+On-demand profiling of OnStar refresh cycles.
+
+Two modes are available:
+- cprofile: deterministic profile of the refresh cycles themselves, their
+  requests on the transport loop included.
+- sample: statistical sampling of every thread while the cycles run, which
+  also covers platform updates running on Home Assistant's threads.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_LOGGER = logging.getLogger(__name__)
+
+MODE_CPROFILE = "cprofile"
+MODE_SAMPLE = "sample"
+PROFILE_MODES = [MODE_CPROFILE, MODE_SAMPLE]
+
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 10
+
+# Threads parked in these modules are idle and are left out of samples
+IDLE_MODULES = {"threading.py", "selectors.py", "queue.py"}
+
+# Since 3.12 cProfile hooks sys.monitoring, which sees every thread and
+# allows a single profiler at a time
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+def _label(code_key):
+    filename, lineno, name = code_key
+    return "%s (%s:%d)" % (name, os.path.basename(filename), lineno)
+
+
+class _Sampler(threading.Thread):
+    """Periodically records the stacks of all other threads."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="onstar_profiler", daemon=True)
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self.samples = 0
+        self.own = Counter()
+        self.total = Counter()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._stop_event.wait(self._interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (
+                    os.path.basename(frame.f_code.co_filename) in IDLE_MODULES
+                ):
+                    continue
+                self.samples += 1
+                seen = set()
+                leaf = True
+                while frame is not None:
+                    code = frame.f_code
+                    key = (code.co_filename, code.co_firstlineno, code.co_name)
+                    if leaf:
+                        self.own[key] += 1
+                        leaf = False
+                    if key not in seen:
+                        seen.add(key)
+                        self.total[key] += 1
+                    frame = frame.f_back
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class CycleProfiler:
+    """Profiles the next N refresh cycles and reports the hot functions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._running = 0
+        self._mode = None
+        self._output_dir = None
+        self._on_report = None
+        self._stats = None
+        self._sampler = None
+
+    @property
+    def active(self):
+        return self._remaining > 0
+
+    def start(self, cycles, mode, output_dir, on_report=None):
+        """Arm the profiler for the next cycles refresh cycles."""
+        with self._lock:
+            if self._remaining or self._running:
+                _LOGGER.warning("OnStar profiling already in progress")
+                return False
+            self._remaining = cycles
+            self._mode = mode
+            self._output_dir = output_dir
+            self._on_report = on_report
+            self._stats = None
+            self._sampler = None
+        _LOGGER.info("Profiling next %d OnStar refresh cycles (%s)", cycles, mode)
+        return True
+
+    @contextmanager
+    def cycle(self):
+        """Profile the enclosed refresh cycle if profiling is armed."""
+        with self._lock:
+            if not self._remaining:
+                profile = None
+            else:
+                self._remaining -= 1
+                self._running += 1
+                profile = True
+                if self._mode == MODE_SAMPLE and self._sampler is None:
+                    self._sampler = _Sampler()
+                    self._sampler.start()
+
+        if profile is None:
+            yield
+            return
+
+        if self._mode == MODE_CPROFILE:
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            yield
+        finally:
+            if self._mode == MODE_CPROFILE:
+                profile.disable()
+            with self._lock:
+                if self._mode == MODE_CPROFILE:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profile)
+                    else:
+                        self._stats.add(profile)
+                self._running -= 1
+                finished = not self._remaining and not self._running
+            if finished:
+                self._finish()
+
+    @contextmanager
+    def thread_profile(self):
+        """Add the enclosed code to a running cprofile cycle.
+
+        For work a cycle hands over to another thread, such as the requests
+        run on the transport loop. Not needed, and not possible, where the
+        cycle's profiler already sees every thread.
+        """
+        with self._lock:
+            collecting = self._running and self._mode == MODE_CPROFILE
+        if not collecting or PROFILES_ALL_THREADS:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+
+    def _finish(self):
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        if self._mode == MODE_CPROFILE:
+            path = os.path.join(self._output_dir, "onstar_profile_%s.prof" % stamp)
+            self._stats.dump_stats(path)
+            rows = sorted(
+                self._stats.stats.items(), key=lambda item: item[1][2],
+                reverse=True)[:TOP_FUNCTIONS]
+            lines = [
+                "%s: %.3f s own, %.3f s cumulative, %d calls" % (
+                    _label(key), tt, ct, nc)
+                for key, (cc, nc, tt, ct, callers) in rows
+            ]
+        else:
+            sampler, self._sampler = self._sampler, None
+            sampler.stop()
+            path = os.path.join(self._output_dir, "onstar_profile_%s.txt" % stamp)
+            with open(path, "w", encoding="utf-8") as fp:
+                fp.write("samples: %d\n" % sampler.samples)
+                for key, count in sampler.total.most_common():
+                    fp.write("%d\t%d\t%s\n" % (
+                        sampler.own[key], count, _label(key)))
+            lines = [
+                "%s: %d own, %d total samples" % (
+                    _label(key), count, sampler.total[key])
+                for key, count in sampler.own.most_common(TOP_FUNCTIONS)
+            ]
+
+        message = "Profile written to %s\n\n%s" % (
+            path, "\n".join("- " + line for line in lines))
+        _LOGGER.info("OnStar profile: %s", message)
+        if self._on_report is not None:
+            self._on_report(message)
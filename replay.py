@@ -0,0 +1,213 @@
+"""
+Record and replay raw OnStar responses.
+
+Responses are stored as gzip compressed NDJSON, one line per response:
+{"ts": <epoch seconds>, "kind": "diagnostics" | "location", "data": {...}}
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+
+_LOGGER = logging.getLogger(__name__)
+
+FILE_PREFIX = "onstar-"
+FILE_SUFFIX = ".ndjson.gz"
+
+KIND_DIAGNOSTICS = "diagnostics"
+KIND_LOCATION = "location"
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 10
+
+
+# Converts OnStar namedtuple tree into plain JSON serializable structures
+def _to_plain(obj):
+    if hasattr(obj, "_asdict"):
+        return {k: _to_plain(v) for k, v in obj._asdict().items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_plain(v) for v in obj]
+    return obj
+
+
+# Same object hook as used by the onstar library, so replayed responses
+# expose exactly the same attributes as live ones
+def _object_hook(d):
+    return namedtuple('X', list(map(lambda x: x.replace('$', '_'), d.keys())))(*d.values())
+
+
+def _recordings(directory):
+    """Return recording files in chronological order."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in sorted(names)
+        if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)
+    ]
+
+
+def read_records(directory):
+    """Yield raw records from all recordings in directory, oldest first."""
+    for path in _recordings(directory):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as fp:
+                for line in fp:
+                    if line.strip():
+                        yield json.loads(line)
+        except (EOFError, OSError, ValueError) as err:
+            # Last file may be truncated if HA was stopped while recording
+            _LOGGER.warning("Stopped reading %s: %s", path, err)
+
+
+class ResponseRecorder:
+    """Streams raw OnStar responses to rotating compressed NDJSON files."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES,
+                 backup_count=DEFAULT_BACKUP_COUNT):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._fp = None
+        self._written = 0
+        self._sequence = 0
+
+    def _open(self):
+        os.makedirs(self._directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        # Several rotations within one second must keep their order
+        while True:
+            path = os.path.join(self._directory, "%s%s-%03d%s" % (
+                FILE_PREFIX, stamp, self._sequence, FILE_SUFFIX))
+            self._sequence += 1
+            if not os.path.exists(path):
+                break
+        self._fp = gzip.open(path, "wb")
+        self._written = 0
+        self._prune()
+
+    def _prune(self):
+        files = _recordings(self._directory)
+        for path in files[:max(0, len(files) - self._backup_count - 1)]:
+            # History export reads the recordings, this much history is gone
+            _LOGGER.info("Removing old recording %s", path)
+            os.remove(path)
+
+    def record(self, kind, response, ts=None):
+        """Append a single response to the current recording."""
+        if self._fp is None or self._written >= self._max_bytes:
+            self.close()
+            self._open()
+
+        line = json.dumps({
+            "ts": time.time() if ts is None else ts,
+            "kind": kind,
+            "data": _to_plain(response),
+        }, separators=(",", ":")) + "\n"
+        raw = line.encode("utf-8")
+        self._fp.write(raw)
+        # Sync flush keeps the file readable up to the last record
+        self._fp.flush()
+        self._written += len(raw)
+
+    def record_client(self, client):
+        """Record the responses held by a refreshed OnStar client."""
+        ts = time.time()
+        self.record(KIND_DIAGNOSTICS, client.get_diagnostics(), ts)
+        location = client.get_location()
+        if location is not None:
+            self.record(KIND_LOCATION, location, ts)
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+
+class ReplayOnStar:
+    """Drop-in replacement for onstar.OnStar serving recorded responses.
+
+    Every refresh() advances to the next recorded diagnostics report, and the
+    location response recorded with it unless the vehicle is not woken. With speed > 0 the original gaps
+    between responses are reproduced, divided by speed, counted from the
+    previous refresh so the time between polls is not waited twice. With
+    speed 0 responses are served as fast as possible. When the recording is
+    exhausted replay starts over from the beginning.
+    """
+
+    def __init__(self, directory, speed=0):
+        self._directory = directory
+        self._speed = speed
+        self._records = None
+        self._pending = None
+        # Times the recording was started over
+        self._passes = 0
+        self._last_ts = None
+        self._last_served = None
+        self._diagnostics_object = None
+        self._location_object = None
+
+    def _next_record(self):
+        if self._pending is not None:
+            record, self._pending = self._pending, None
+            return record
+        if self._records is None:
+            self._records = read_records(self._directory)
+        record = next(self._records, None)
+        if record is None:
+            # Wrap around, without waiting for the gap between last and first
+            self._records = read_records(self._directory)
+            self._passes += 1
+            self._last_ts = None
+            record = next(self._records, None)
+            if record is None:
+                raise FileNotFoundError(
+                    "No OnStar recordings in %s" % self._directory)
+        return record
+
+    async def _wait(self, ts):
+        if self._speed and self._last_ts is not None and ts > self._last_ts:
+            # Only the part of the gap not already spent between refreshes
+            delay = ((ts - self._last_ts) / self._speed
+                     - (time.monotonic() - self._last_served))
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self._last_ts = ts
+        self._last_served = time.monotonic()
+
+    async def refresh(self, wake=True):
+        passes = self._passes
+        record = self._next_record()
+        while record["kind"] != KIND_DIAGNOSTICS:
+            if self._passes - passes > 1:
+                # A whole pass without a report, it would loop forever
+                raise FileNotFoundError(
+                    "No OnStar diagnostics recorded in %s" % self._directory)
+            record = self._next_record()
+        try:
+            await self._wait(record["ts"])
+        except asyncio.CancelledError:
+            # Timed out, the next refresh serves the same report
+            self._pending = record
+            raise
+        self._diagnostics_object = json.loads(
+            json.dumps(record["data"]), object_hook=_object_hook)
+
+        self._location_object = None
+        following = self._next_record()
+        if following["kind"] != KIND_LOCATION:
+            self._pending = following
+        elif wake:
+            self._location_object = json.loads(
+                json.dumps(following["data"]), object_hook=_object_hook)
+
+    def get_diagnostics(self):
+        return self._diagnostics_object
+
+    def get_location(self):
+        return self._location_object
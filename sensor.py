@@ -2,21 +2,32 @@
 Provides a sensor to track Opel OnStar information.
 """
 import logging
+from datetime import datetime, timezone
 
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.const import EntityCategory
 from homeassistant.exceptions import PlatformNotReady
 
+from .callback_watchdog import measure
 from .const import DOMAIN
+from .diagnostics import SECTION_SENSOR_PREFIX
+from .fleet import FLEET_SENSOR_TYPES
 
 _LOGGER = logging.getLogger(__name__)
 
+# Carries the refresh bookkeeping, which changes on every cycle
+DIAGNOSTIC_SENSOR = "onstar.laststatus"
+
 
 def setup_platform(hass, config, add_entities, discovery_info=None):
     """Set up the OnStar sensor platform."""
     data = hass.data[DOMAIN]
+    data.wait_for_initial_fetch()
 
     if data.status is None:
         _LOGGER.error("No data received from OnStar, unable to setup")
+        # Retried by Home Assistant, make sure fresh data is on its way
+        data.schedule_refresh()
         raise PlatformNotReady
 
     _LOGGER.info("OnStar sensors available: %s", data.status)
@@ -24,17 +35,28 @@ def setup_platform(hass, config, add_entities, discovery_info=None):
     entities = []
 
     for resource in data.status:
-        if resource in data.SENSOR_TYPES:
-            entities.append(OnStarSensor(data, resource))
-        else:
+        if resource not in data.SENSOR_TYPES:
             _LOGGER.warning(
                 "Sensor type: %s does not appear in OnStar sensor types, "
                 "cannot add",
                 resource,
             )
+        elif resource in data.fields:
+            entities.append(OnStarSensor(data, resource))
+
+    if data.fleet is not None:
+        entities.extend(
+            OnStarFleetSensor(data, sensor_type) for sensor_type in FLEET_SENSOR_TYPES)
+
+    # Seed entities from the shared snapshot instead of one fetch per entity
+    for entity in entities:
+        entity.update()
 
-    data.update(no_throttle=True)
-    add_entities(entities, True)
+    # Disabled by default and not seeded, a section is only decoded once its
+    # entity is enabled and updated
+    entities.extend(
+        OnStarSectionSensor(data, section) for section in data.report_sections())
+    add_entities(entities, False)
 
 
 class OnStarSensor(SensorEntity):
@@ -45,12 +67,18 @@ class OnStarSensor(SensorEntity):
         self._data = data
         self.type = sensor_type
 
-        sensor_info = self._data.SENSOR_TYPES[sensor_type]
+        sensor_info = self._sensor_types()[sensor_type]
         self._attr_name = sensor_info[0]
         self._attr_unique_id = f"onstar_{sensor_type.replace('.', '_')}"
         self._attr_native_unit_of_measurement = sensor_info[1]
         self._attr_icon = sensor_info[2]
+        if sensor_type == DIAGNOSTIC_SENSOR:
+            self._attr_entity_category = EntityCategory.DIAGNOSTIC
         self._state = None
+        self._revision = None
+
+    def _sensor_types(self):
+        return self._data.SENSOR_TYPES
 
     @property
     def should_poll(self):
@@ -62,30 +90,125 @@ class OnStarSensor(SensorEntity):
         """Return entity state."""
         return self._state
 
+    @property
+    def available(self):
+        """Return True until the last snapshot exceeds max staleness."""
+        return not self._data.expired
+
     @property
     def extra_state_attributes(self):
         """Return the sensor attributes."""
-        return {"state": self.display_state()}
+        # Only values that stay put between changed reports, anything moving
+        # every cycle lives on the diagnostic sensor alone
+        changed = self._data.last_changed(self.type)
+        attrs = {
+            "state": self.display_state(),
+            "stale": self._data.stale,
+            "last_changed": None if changed is None else
+            datetime.fromtimestamp(changed, timezone.utc).isoformat(),
+        }
+        if self.type == "onstar.localization":
+            attrs["address"] = self._data.address
+        elif self.type == DIAGNOSTIC_SENSOR:
+            refreshed = self._data.last_refresh
+            attrs["last_refresh"] = (
+                None if refreshed is None else
+                datetime.fromtimestamp(refreshed, timezone.utc).isoformat())
+            attrs.update(self._data.transport_stats)
+            attrs.update(
+                ("executor_" + key, value)
+                for key, value in self._data.executor_stats.items())
+        return attrs
 
     def display_state(self):
         """Return display state."""
-        if self._data.status is None:
+        if self._data.status is None or self._data.expired:
             return "OFF"
         return "ON"
 
     def update(self):
         """Get the latest status and use it to update our sensor state."""
+        with measure(self._data.watchdog, "sensor %s update" % self.type):
+            self._update()
+
+    def _update(self):
         _LOGGER.debug("Update state")
-        if self._data.status is None:
+        # Serve the current snapshot, refreshing it in the background if due
+        self._data.schedule_refresh()
+        if self._data.status is None or self._data.expired:
             self._state = None
+            self._revision = None
             return
 
-        if self.type not in self._data.status:
-            self._state = None
-        else:
-            self._state = self._data.status[self.type]
+        # Nothing to do until the data object saw a changed report
+        if self._revision == self._data.revision:
+            return
+        self._revision = self._data.revision
+
+        self._state = self._value()
+
+    def _value(self):
+        return self._data.status.get(self.type)
 
     @property
     def force_update(self):
         """Return True if state updates should be forced."""
         return False
+
+
+class OnStarFleetSensor(OnStarSensor):
+    """Representation of a fleet wide aggregate sensor."""
+
+    def _sensor_types(self):
+        return FLEET_SENSOR_TYPES
+
+    @property
+    def extra_state_attributes(self):
+        """Return the sensor attributes."""
+        attrs = super().extra_state_attributes
+        attrs.update(self._data.fleet.attributes[self.type])
+        return attrs
+
+    def _update(self):
+        # Aggregates also change without a new report, the day rolling over
+        # at midnight, and are cheap to read
+        self._data.schedule_refresh()
+        if self._data.status is None or self._data.expired:
+            self._state = None
+            return
+        self._state = self._value()
+
+    def _value(self):
+        return self._data.fleet.values[self.type]
+
+
+class OnStarSectionSensor(OnStarSensor):
+    """Representation of a section of the diagnostics report."""
+
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, data, section):
+        """Initialize the sensor."""
+        self._section = section
+        self._details = {}
+        super().__init__(data, SECTION_SENSOR_PREFIX + section)
+
+    def _sensor_types(self):
+        title = "".join(
+            " " + c.lower() if c.isupper() else c for c in self._section)
+        return {self.type: [title.capitalize() + " diagnostics", None, 'mdi:car-wrench']}
+
+    @property
+    def extra_state_attributes(self):
+        """Return the sensor attributes."""
+        attrs = super().extra_state_attributes
+        attrs.update(self._details)
+        return attrs
+
+    def _value(self):
+        section = self._data.section(self._section)
+        if not isinstance(section, dict):
+            self._details = {}
+            return section
+        self._details = {k: v for k, v in section.items() if k != "status"}
+        return section.get("status")
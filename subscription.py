@@ -0,0 +1,159 @@
+"""
+Push delivery of vehicle status changes to asyncio consumers.
+
+Refreshes run on the OnStar pool and publish from there; every subscriber
+gets the changes on its own event loop, through a bounded queue that drops
+the oldest change when the consumer falls behind.
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, NamedTuple
+
+from .const import SUBSCRIPTION_QUEUE_SIZE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StatusChange(NamedTuple):
+    """Fields of one vehicle that changed in a refresh."""
+
+    vin: str | None
+    revision: int
+    changed_at: float
+    # field -> (previous value, new value)
+    changes: dict[str, tuple[Any, Any]]
+
+
+class Subscription:
+    """A consumer's view of the change stream.
+
+    Iterate it with ``async for`` or give a callback, which is then run on
+    the subscriber's loop for every change.
+    """
+
+    def __init__(self, hub, loop, vin=None, fields=None,
+                 maxsize=SUBSCRIPTION_QUEUE_SIZE, callback=None):
+        self._hub = hub
+        self._loop = loop
+        self._vin = vin
+        self._fields = None if fields is None else frozenset(fields)
+        self._callback = callback
+        self._queue = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+        self._wakeup_pending = False
+        self._event = asyncio.Event()
+        self._closed = False
+        self.dropped = 0
+
+    def _filter(self, change):
+        if self._vin is not None and change.vin != self._vin:
+            return None
+        if self._fields is None:
+            return change
+        changes = {
+            field: values for field, values in change.changes.items()
+            if field in self._fields
+        }
+        return change._replace(changes=changes) if changes else None
+
+    def _put(self, change):
+        # Called from any thread, at most one wake-up is queued on the loop
+        change = self._filter(change)
+        if change is None:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(change)
+            if self._wakeup_pending:
+                return
+            self._wakeup_pending = True
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup)
+        except RuntimeError:
+            _LOGGER.debug("Event loop of OnStar subscriber is closed")
+            self.close()
+
+    def _wakeup(self):
+        with self._lock:
+            self._wakeup_pending = False
+        if self._callback is None:
+            self._event.set()
+            return
+        while True:
+            with self._lock:
+                if self._closed or not self._queue:
+                    return
+                change = self._queue.popleft()
+            try:
+                self._callback(change)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error in OnStar change callback")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            with self._lock:
+                if self._queue:
+                    return self._queue.popleft()
+                if self._closed:
+                    raise StopAsyncIteration
+            self._event.clear()
+            await self._event.wait()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop receiving changes, a pending iteration ends."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._hub.remove(self)
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass
+
+
+class SubscriptionHub:
+    """Fans status changes out to the current subscriptions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: list[Subscription] = []
+
+    def subscribe(self, loop, vin=None, fields=None,
+                  maxsize=SUBSCRIPTION_QUEUE_SIZE,
+                  callback: Callable[[StatusChange], Any] | None = None):
+        """Return a new subscription delivering on loop."""
+        subscription = Subscription(self, loop, vin, fields, maxsize, callback)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def remove(self, subscription):
+        """Forget subscription."""
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def publish(self, change: StatusChange):
+        """Queue change for every matching subscription, never blocks."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription._put(change)  # pylint: disable=protected-access
@@ -1,5 +1,6 @@
 """Shared fixtures for OnStar component tests."""
 import sys
+from enum import Enum
 from types import ModuleType
 from unittest.mock import MagicMock, PropertyMock
 
@@ -27,6 +28,13 @@ def _create_ha_stubs():
     ha.const.CONF_USERNAME = "username"
     ha.const.CONF_PASSWORD = "password"
     ha.const.CONF_PIN = "pin"
+    ha.const.EVENT_HOMEASSISTANT_STOP = "homeassistant_stop"
+
+    class EntityCategory(str, Enum):
+        CONFIG = "config"
+        DIAGNOSTIC = "diagnostic"
+
+    ha.const.EntityCategory = EntityCategory
 
     ha.exceptions = _mod("homeassistant.exceptions")
 
@@ -39,12 +47,18 @@ def _create_ha_stubs():
     ha.helpers = _mod("homeassistant.helpers")
     ha.helpers.config_validation = _mod("homeassistant.helpers.config_validation")
     ha.helpers.config_validation.string = str
+    ha.helpers.config_validation.time_period = lambda value: value
+    ha.helpers.config_validation.datetime = lambda value: value
+    ha.helpers.config_validation.ensure_list = lambda value: value
+    ha.helpers.config_validation.boolean = bool
     ha.helpers.discovery = _mod("homeassistant.helpers.discovery")
     ha.helpers.discovery.load_platform = MagicMock()
     ha.helpers.entity = _mod("homeassistant.helpers.entity")
     ha.helpers.entity.Entity = type("Entity", (), {})
     ha.helpers.event = _mod("homeassistant.helpers.event")
     ha.helpers.event.track_utc_time_change = MagicMock()
+    ha.helpers.event.track_time_interval = MagicMock()
+
 
     # components.sensor
     ha.components = _mod("homeassistant.components")
@@ -58,6 +72,10 @@ def _create_ha_stubs():
         },
     )
 
+    ha.components.persistent_notification = _mod(
+        "homeassistant.components.persistent_notification")
+    ha.components.persistent_notification.create = MagicMock()
+
     # util
     ha.util = _mod("homeassistant.util")
 
@@ -83,14 +101,94 @@ def _create_ha_stubs():
     # voluptuous
     vol = _mod("voluptuous")
     vol.Schema = MagicMock(return_value=MagicMock())
-    vol.Required = MagicMock(side_effect=lambda x: x)
-    vol.Optional = MagicMock(side_effect=lambda x: x)
+    vol.Required = MagicMock(side_effect=lambda x, **kwargs: x)
+    vol.Optional = MagicMock(side_effect=lambda x, **kwargs: x)
+    vol.Coerce = MagicMock(side_effect=lambda x: x)
+    vol.In = MagicMock(side_effect=lambda x: x)
+    vol.Range = MagicMock(side_effect=lambda **kwargs: kwargs)
+    vol.All = MagicMock(side_effect=lambda *x: x)
     vol.ALLOW_EXTRA = "ALLOW_EXTRA"
 
+    # aiohttp
+    aiohttp = _mod("aiohttp")
+
+    class ClientError(Exception):
+        pass
+
+    class TraceConfig:
+        def __init__(self):
+            for signal in (
+                "on_request_start", "on_request_end",
+                "on_connection_create_end", "on_connection_reuseconn",
+                "on_dns_cache_hit", "on_dns_cache_miss",
+            ):
+                setattr(self, signal, [])
+
+    class ClientSession:
+        def __init__(self, connector=None, trace_configs=None, **kwargs):
+            self.connector = connector
+            self.trace_configs = trace_configs or []
+            self.closed = False
+
+        async def close(self):
+            self.closed = True
+
+    aiohttp.ClientError = ClientError
+    aiohttp.TraceConfig = TraceConfig
+    aiohttp.ClientSession = ClientSession
+    aiohttp.TCPConnector = MagicMock()
+
     # onstar SDK
     onstar_pkg = _mod("onstar")
     onstar_mod = _mod("onstar.onstar")
-    onstar_mod.OnStar = MagicMock()
+
+    class OnStar:
+        """Mirror of onstar.onstar.OnStar without any network access."""
+
+        _LOGIN_URL = "https://onstar.invalid/login.json"
+
+        def __init__(self, username, password, pin, loop, dump_json=False):
+            self._username = username
+            self._password = password
+            self._pin = pin
+            self._loop = loop
+            self._session = None
+            self.calls = []
+
+        async def refresh(self):
+            await self._login()
+            await self._login_info()
+            await self._diagnostics()
+            await self._location()
+            await self._session.close()
+
+        async def _login(self):
+            self.calls.append("login")
+            self._session = MagicMock()
+
+            async def close():
+                self.calls.append("close")
+
+            self._session.close = close
+
+        async def _login_info(self):
+            self.calls.append("login_info")
+
+        async def _diagnostics(self):
+            self.calls.append("diagnostics")
+            self._diagnostics_object = MagicMock()
+
+        async def _location(self):
+            self.calls.append("location")
+            self._location_object = MagicMock()
+
+        def get_diagnostics(self):
+            return self._diagnostics_object
+
+        def get_location(self):
+            return self._location_object
+
+    onstar_mod.OnStar = OnStar
 
     # Register everything in sys.modules
     for name, mod in stubs.items():
@@ -168,7 +266,21 @@ def mock_data():
     data = MagicMock()
     data.SENSOR_TYPES = SENSOR_TYPES.copy()
     type(data).status = PropertyMock(return_value=SAMPLE_STATUS.copy())
+    data.data_age = 12.5
+    data.last_refresh = 1736937000.0
+    data.stale = False
+    data.expired = False
+    data.revision = 1
+    data.last_changed = MagicMock(return_value=1736937000.0)
     data.gps_position = (48.8566, 2.3522)
+    data.address = "Place de l'Hotel de Ville, Paris"
+    data.watchdog = None
+    data.fleet = None
+    data.parking = None
+    data.report_sections = MagicMock(return_value=[])
+    data.fields = set(SENSOR_TYPES)
+    data.transport_stats = {"requests": 4, "connections_reused": 3}
+    data.executor_stats = {"queue_depth": 0, "submitted": 5, "failed": 1}
     data._pin = "1234"
     data.update = MagicMock()
     return data
@@ -180,7 +292,19 @@ def mock_data_no_status():
     data = MagicMock()
     data.SENSOR_TYPES = SENSOR_TYPES.copy()
     type(data).status = PropertyMock(return_value=None)
+    data.data_age = None
+    data.last_refresh = None
+    data.stale = True
+    data.expired = True
+    data.revision = 0
+    data.last_changed = MagicMock(return_value=None)
     data.gps_position = None
+    data.address = None
+    data.watchdog = None
+    data.fleet = None
+    data.parking = None
+    data.report_sections = MagicMock(return_value=[])
+    data.fields = set(SENSOR_TYPES)
     data._pin = "1234"
     data.update = MagicMock()
     return data
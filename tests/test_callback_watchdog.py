@@ -0,0 +1,195 @@
+"""Tests for callback_watchdog.py (slow callback detection)."""
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from onstar_component.callback_watchdog import (
+    LOOP_PROBE_NAME,
+    CallbackWatchdog,
+    measure,
+)
+from onstar_component.device_tracker import OnstarDeviceTracker
+from onstar_component.sensor import OnStarSensor
+
+
+@pytest.fixture()
+def watchdog():
+    dog = CallbackWatchdog(0.02, worst_cases=2)
+    yield dog
+    dog.stop()
+
+
+def _blocking_call():
+    time.sleep(0.1)
+
+
+class TestCallbackWatchdog:
+    """Tests for measuring callbacks."""
+
+    def test_fast_callbacks_are_not_recorded(self, watchdog):
+        with patch("onstar_component.callback_watchdog._LOGGER") as logger:
+            watchdog.watch("fast", lambda: None)()
+        logger.warning.assert_not_called()
+        assert watchdog.worst == []
+
+    def test_slow_callback_is_reported_with_stack(self, watchdog):
+        with patch("onstar_component.callback_watchdog._LOGGER") as logger:
+            watchdog.watch("slow", _blocking_call)()
+
+        logger.warning.assert_called_once()
+        ((duration, name, stack),) = watchdog.worst
+        assert name == "slow"
+        assert duration >= 0.1
+        # Sampled while the callback was still running
+        assert "_blocking_call" in stack
+
+    def test_keeps_worst_cases_only(self, watchdog):
+        for delay in (0.03, 0.06, 0.045):
+            with watchdog.measure("call %s" % delay):
+                time.sleep(delay)
+        assert [name for _, name, _ in watchdog.worst] == [
+            "call 0.06", "call 0.045"]
+
+    def test_wrapped_result_and_errors_propagate(self, watchdog):
+        assert watchdog.watch("add", lambda a, b: a + b)(1, 2) == 3
+
+        def boom():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            watchdog.watch("boom", boom)()
+
+    def test_coroutine_steps_are_measured_without_suspensions(self, watchdog):
+        async def request():
+            await asyncio.sleep(0.1)
+            _blocking_call()
+            return "response"
+
+        loop = asyncio.new_event_loop()
+        try:
+            result = loop.run_until_complete(
+                watchdog.watch_coroutine("transport request", request()))
+        finally:
+            loop.close()
+
+        assert result == "response"
+        ((duration, name, stack),) = watchdog.worst
+        assert name == "transport request"
+        # Only the blocking step, not the sleep before it
+        assert 0.1 <= duration < 0.2
+        assert "_blocking_call" in stack
+
+    def test_coroutine_errors_propagate(self, watchdog):
+        async def request():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        loop = asyncio.new_event_loop()
+        try:
+            with pytest.raises(ValueError):
+                loop.run_until_complete(
+                    watchdog.watch_coroutine("transport request", request()))
+        finally:
+            loop.close()
+
+    def test_loop_probe_samples_blocked_loop(self, watchdog):
+        loop = asyncio.new_event_loop()
+        try:
+            with patch("onstar_component.callback_watchdog._LOGGER") as logger:
+                watchdog.probe_loop(loop, interval=0.01)
+                loop.call_later(0.005, _blocking_call)
+                loop.run_until_complete(asyncio.sleep(0.15))
+        finally:
+            loop.close()
+
+        logger.warning.assert_called_once()
+        ((lag, name, stack),) = watchdog.worst
+        assert name == LOOP_PROBE_NAME
+        assert lag >= 0.05
+        assert "_blocking_call" in stack
+
+    def test_loop_probe_stops(self, watchdog):
+        loop = asyncio.new_event_loop()
+        try:
+            watchdog.probe_loop(loop, interval=0.01)
+            loop.run_until_complete(asyncio.sleep(0.03))
+            watchdog.stop()
+            loop.run_until_complete(asyncio.sleep(0.03))
+            assert not [
+                handle for handle in loop._scheduled if not handle.cancelled()]
+        finally:
+            loop.close()
+
+    def test_measure_without_watchdog(self):
+        with measure(None, "disabled"):
+            pass
+
+
+class TestWatchedEntities:
+    """Tests for entity updates running under the watchdog."""
+
+    def test_sensor_update_is_measured(self, mock_data):
+        mock_data.watchdog = MagicMock()
+        sensor = OnStarSensor(mock_data, "onstar.fuellevel")
+        sensor.update()
+        mock_data.watchdog.measure.assert_called_once_with(
+            "sensor onstar.fuellevel update")
+        assert sensor.native_value == 72
+
+    def test_setup_probes_home_assistant_loop(self):
+        from onstar_component import OnStarData, setup
+        from onstar_component.const import DOMAIN
+
+        hass = MagicMock()
+        hass.data = {}
+        with patch("onstar_component.discovery"), patch.object(
+            OnStarData, "start_initial_fetch"
+        ):
+            setup(hass, {DOMAIN: {
+                "username": "u", "password": "p", "watchdog_threshold": 0.1}})
+        data = hass.data[DOMAIN]
+        try:
+            hass.loop.call_soon_threadsafe.assert_called_once()
+            assert hass.loop.call_soon_threadsafe.call_args[0][1] is hass.loop
+        finally:
+            data.watchdog.stop()
+            data.transport.close()
+            data.executor.shutdown()
+
+    def test_transport_request_is_measured(self, watchdog):
+        from onstar_component import OnStarData
+
+        from .test_replay import DIAGNOSTICS, LOCATION, _response
+
+        async def refresh(wake=True):
+            await asyncio.sleep(0)
+            _blocking_call()
+
+        client = MagicMock()
+        client.refresh = refresh
+        client.get_diagnostics.return_value = _response(DIAGNOSTICS)
+        client.get_location.return_value = _response(LOCATION)
+        data = OnStarData(
+            "user", "pass", "1234", replay=client, watchdog=watchdog)
+        try:
+            assert data._get_status()["onstar.plate"] == "ABC1234"
+        finally:
+            data.transport.close()
+            data.executor.shutdown()
+        assert [name for _, name, _ in watchdog.worst] == ["transport request"]
+
+    def test_tracker_timer_is_measured(self, mock_data):
+        mock_data.watchdog = MagicMock()
+        tracker = OnstarDeviceTracker(MagicMock(), mock_data)
+        with patch(
+            "onstar_component.device_tracker.track_utc_time_change"
+        ) as mock_track, patch.object(tracker, "update") as mock_update:
+            tracker.setup(MagicMock())
+            timer = mock_track.call_args[0][1]
+            timer(None)
+
+        mock_data.watchdog.measure.assert_called_once_with(
+            "device_tracker update")
+        assert mock_update.call_count == 2
@@ -0,0 +1,40 @@
+"""Tests for client.py (cheap vs wake-up refresh)."""
+import asyncio
+
+import pytest
+
+from onstar_component.client import OnStarClient
+
+
+@pytest.fixture()
+def run():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+class TestOnStarClient:
+    """Tests for the two refresh tiers."""
+
+    def test_wake_performs_full_refresh(self, run):
+        client = OnStarClient("user", "pass", "1234", None)
+        run(client.refresh(wake=True))
+        assert client.calls == [
+            "login", "login_info", "diagnostics", "location", "close"]
+
+    def test_cheap_refresh_skips_location_query(self, run):
+        client = OnStarClient("user", "pass", "1234", None)
+        run(client.refresh(wake=False))
+        assert client.calls == ["login", "login_info", "diagnostics", "close"]
+        assert client.get_location() is None
+
+    def test_cheap_refresh_closes_session_on_error(self, run):
+        client = OnStarClient("user", "pass", "1234", None)
+
+        async def fail():
+            raise ConnectionResetError("reset")
+
+        client._diagnostics = fail
+        with pytest.raises(ConnectionResetError):
+            run(client.refresh(wake=False))
+        assert client.calls[-1] == "close"
@@ -20,6 +20,11 @@ class TestSetupScanner:
         result = setup_scanner(mock_hass, {}, see)
         assert result is True
 
+    def test_waits_for_shared_initial_fetch(self, mock_hass, mock_data):
+        setup_scanner(mock_hass, {}, MagicMock())
+        mock_data.wait_for_initial_fetch.assert_called_once()
+        mock_data.update.assert_not_called()
+
     def test_creates_tracker(self, mock_hass, mock_data):
         """setup_scanner should create a tracker and call setup."""
         see = MagicMock()
@@ -83,6 +88,18 @@ class TestOnstarDeviceTracker:
         assert "vin" in call_kwargs["attributes"]
         assert call_kwargs["attributes"]["vin"] == "1HGCM82639A123456"
 
+    def test_update_reports_parking_attributes(self, mock_data):
+        """Parking spot and suggested zones are tracker attributes."""
+        mock_data.parking = MagicMock()
+        mock_data.parking.attributes.return_value = {
+            "parked_at": "Parking 1", "suggested_zones": []}
+        see = MagicMock()
+
+        OnstarDeviceTracker(see, mock_data).update()
+
+        mock_data.parking.attributes.assert_called_once_with("1HGCM82639A123456")
+        assert see.call_args[1]["attributes"]["parked_at"] == "Parking 1"
+
     def test_update_skips_when_pin_is_none(self, mock_data):
         """When pin is None, tracking should be disabled."""
         mock_data._pin = None
@@ -93,6 +110,17 @@ class TestOnstarDeviceTracker:
 
         see.assert_not_called()
 
+    def test_update_skips_when_snapshot_expired(self, mock_data):
+        """No position is reported once the snapshot is too old."""
+        mock_data.expired = True
+        see = MagicMock()
+        tracker = OnstarDeviceTracker(see, mock_data)
+
+        tracker.update()
+
+        see.assert_not_called()
+        mock_data.schedule_refresh.assert_called_once()
+
     def test_update_device_id_is_slugified(self, mock_data):
         """The dev_id passed to see() should be a slugified version of the plate."""
         see = MagicMock()
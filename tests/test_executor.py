@@ -0,0 +1,115 @@
+"""Tests for executor.py (dedicated OnStar thread pool)."""
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from onstar_component import OnStarData
+from onstar_component.executor import OnStarExecutor, OnStarExecutorFull
+
+
+@pytest.fixture()
+def executor():
+    pool = OnStarExecutor(max_workers=1, max_queue=1)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+class TestOnStarExecutor:
+    """Tests for the bounded pool."""
+
+    def test_submit_returns_result(self, executor):
+        assert executor.submit(lambda a, b: a + b, 1, b=2).result() == 3
+
+    def test_runs_on_named_thread(self, executor):
+        name = executor.submit(lambda: threading.current_thread().name).result()
+        assert name.startswith("onstar")
+
+    def test_exceptions_propagate_and_are_counted(self, executor):
+        def boom():
+            raise ConnectionResetError("reset")
+
+        with pytest.raises(ConnectionResetError):
+            executor.submit(boom).result()
+        assert executor.stats["failed"] == 1
+        assert executor.stats["active"] == 0
+
+    def test_rejects_when_queue_is_full(self, executor):
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait(5)
+
+        running = executor.submit(blocking)
+        started.wait(5)
+        queued = executor.submit(blocking)
+        assert executor.stats["queue_depth"] == 1
+
+        with pytest.raises(OnStarExecutorFull):
+            executor.submit(blocking)
+
+        release.set()
+        running.result(5)
+        queued.result(5)
+
+        stats = executor.stats
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+        assert stats["max_queue_depth"] == 1
+        assert stats["queue_depth"] == 0
+
+    def test_slots_are_released(self, executor):
+        for _ in range(5):
+            executor.submit(lambda: None).result()
+        assert executor.stats["submitted"] == 5
+
+
+class TestOnStarDataExecutor:
+    """Tests for OnStarData using the pool."""
+
+    def test_update_runs_get_status_on_pool(self):
+        data = OnStarData("user", "pass", "1234")
+        data._get_status = MagicMock(
+            side_effect=lambda wake=None: {"thread": threading.current_thread().name})
+        data.update().result()
+        assert data.status["thread"].startswith("onstar")
+        data.executor.shutdown()
+
+    def test_update_keeps_status_when_pool_is_full(self):
+        pool = MagicMock()
+        pool.submit.side_effect = OnStarExecutorFull("full")
+        data = OnStarData("user", "pass", "1234", executor=pool)
+        data._status = {"onstar.plate": "XYZ"}
+        assert data.update() is None
+        assert data.status == {"onstar.plate": "XYZ"}
+
+    def test_update_does_not_wait_for_refresh(self):
+        data = OnStarData("user", "pass", "1234")
+        release = threading.Event()
+
+        def slow_status(wake=None):
+            release.wait(5)
+            return {"onstar.plate": "XYZ"}
+
+        data._get_status = MagicMock(side_effect=slow_status)
+        future = data.update()
+        assert not future.done()
+        assert data.status is None
+
+        release.set()
+        future.result(5)
+        assert data.status == {"onstar.plate": "XYZ"}
+        data.executor.shutdown()
+
+    def test_failed_update_is_reported(self):
+        data = OnStarData("user", "pass", "1234")
+        data._get_status = MagicMock(side_effect=ValueError("bad report"))
+        with patch("onstar_component._LOGGER") as logger:
+            future = data.update()
+            with pytest.raises(ValueError):
+                future.result(5)
+            data.executor.shutdown(wait=True)
+        logger.error.assert_called_once()
+        assert data.executor_stats["failed"] == 1
@@ -0,0 +1,206 @@
+"""Tests for export.py (streaming history export)."""
+import csv
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from onstar_component import setup
+from onstar_component.const import DOMAIN
+from onstar_component.diagnostics import extract_status
+from onstar_component.export import (
+    FORMAT_CSV,
+    export_history,
+    iter_history,
+    write_csv,
+    write_ndjson,
+)
+from onstar_component.replay import KIND_DIAGNOSTICS, KIND_LOCATION, ResponseRecorder
+
+from .test_replay import DIAGNOSTICS, LOCATION, _response
+
+
+@pytest.fixture()
+def recording(tmp_path):
+    directory = tmp_path / "recordings"
+    recorder = ResponseRecorder(str(directory))
+    for ts, odometer in ((1000, 45000.4), (2000, 45100.0), (3000, 45200.0)):
+        diagnostics = json.loads(json.dumps(DIAGNOSTICS))
+        diagnostics["results"][0]["reportData"]["metrics"]["odometer"] = odometer
+        recorder.record(KIND_DIAGNOSTICS, _response(diagnostics), ts=ts)
+        recorder.record(KIND_LOCATION, _response(LOCATION), ts=ts)
+    recorder.close()
+    return str(directory)
+
+
+class TestIterHistory:
+    """Tests for building rows from recordings."""
+
+    def test_rows_for_snapshots_and_positions(self, recording):
+        from onstar_component.replay import read_records
+
+        rows = list(iter_history(read_records(recording)))
+        assert len(rows) == 6
+        assert rows[0]["onstar.odometer"] == 45000
+        assert rows[0]["vin"] == "VIN1"
+        assert rows[0]["time"] == "1970-01-01T00:16:40+00:00"
+        assert rows[1] == {
+            "time": "1970-01-01T00:16:40+00:00",
+            "vin": "VIN1",
+            "onstar.localization": [48.8566, 2.3522],
+        }
+
+    def test_time_range_and_field_filters(self, recording):
+        from onstar_component.replay import read_records
+
+        rows = list(iter_history(
+            read_records(recording), start=1500, end=2500,
+            fields={"onstar.odometer"}))
+        # Position rows carry no selected field and are skipped
+        assert [row["onstar.odometer"] for row in rows] == [45100]
+        assert set(rows[0]) == {"time", "vin", "onstar.odometer"}
+
+    def test_vin_filter(self, recording):
+        from onstar_component.replay import read_records
+
+        assert list(iter_history(read_records(recording), vin="OTHER")) == []
+
+    def test_filtered_out_records_are_not_decoded(self, recording):
+        from onstar_component.replay import read_records
+
+        with patch("onstar_component.export.extract_status",
+                   wraps=extract_status) as mock_extract, patch(
+                "onstar_component.export.latest_location") as mock_location:
+            rows = list(iter_history(
+                read_records(recording), start=1500, end=2500,
+                fields={"onstar.odometer"}))
+        assert len(rows) == 1
+        mock_extract.assert_called_once()
+        assert mock_extract.call_args[0][1] == {"onstar.odometer"}
+        mock_location.assert_not_called()
+
+    def test_positions_keep_vin_of_earlier_report(self):
+        records = [
+            {"ts": 1000, "kind": KIND_DIAGNOSTICS, "data": DIAGNOSTICS},
+            {"ts": 3000, "kind": KIND_LOCATION, "data": LOCATION},
+        ]
+        # The report before the range still tells which vehicle moved
+        (row,) = iter_history(iter(records), start=2500, vin="VIN1")
+        assert row["vin"] == "VIN1"
+        assert row["onstar.localization"] == [48.8566, 2.3522]
+
+    def test_rows_are_generated_lazily(self):
+        records = iter([{"ts": 1, "kind": KIND_LOCATION, "data": LOCATION}])
+        rows = iter_history(records)
+        assert next(rows)["onstar.localization"] == [48.8566, 2.3522]
+
+
+class TestExportHistory:
+    """Tests for writing export files."""
+
+    def test_ndjson_export(self, recording, tmp_path):
+        path = str(tmp_path / "out.ndjson")
+        count = export_history(recording, path, fields=["onstar.odometer"])
+
+        lines = open(path).read().splitlines()
+        assert count == 3
+        assert [json.loads(line)["onstar.odometer"] for line in lines] == [
+            45000, 45100, 45200]
+
+    def test_csv_export(self, recording, tmp_path):
+        path = str(tmp_path / "out.csv")
+        count = export_history(
+            recording, path, FORMAT_CSV,
+            fields=["onstar.odometer", "onstar.localization"])
+
+        with open(path, newline="") as fp:
+            rows = list(csv.DictReader(fp))
+        assert count == 6
+        assert list(rows[0]) == [
+            "time", "vin", "onstar.odometer", "onstar.localization"]
+        assert rows[0]["onstar.odometer"] == "45000"
+        assert json.loads(rows[1]["onstar.localization"]) == [48.8566, 2.3522]
+
+    def test_object_fix_is_exported_as_coordinates(self, tmp_path):
+        location = {"results": [
+            {"index": 0, "location": {"lat": 48.8566, "lon": 2.3522}}]}
+        records = iter([{"ts": 1000, "kind": KIND_LOCATION, "data": location}])
+        rows = list(iter_history(records))
+        assert rows[0]["onstar.localization"] == [48.8566, 2.3522]
+
+        path = tmp_path / "out.csv"
+        with open(path, "w", newline="") as fp:
+            write_csv(rows, fp, ["onstar.localization"])
+        with open(path, newline="") as fp:
+            (row,) = csv.DictReader(fp)
+        assert json.loads(row["onstar.localization"]) == [48.8566, 2.3522]
+
+    def test_failed_export_leaves_no_file(self, recording, tmp_path):
+        path = tmp_path / "out.ndjson"
+        with patch("onstar_component.export.write_ndjson",
+                   side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                export_history(recording, str(path))
+        assert list(tmp_path.glob("out.ndjson*")) == []
+
+    def test_write_ndjson_in_chunks(self):
+        fp = MagicMock()
+        count = write_ndjson(({"n": n} for n in range(5)), fp, chunk_size=2)
+        assert count == 5
+        assert fp.write.call_count == 3
+
+
+class TestExportService:
+    """Tests for the export_history service."""
+
+    def _setup(self, tmp_path, record_dir="recordings"):
+        config = {DOMAIN: {"username": "u", "password": "p"}}
+        if record_dir:
+            config[DOMAIN]["record_dir"] = record_dir
+        hass = MagicMock()
+        hass.data = {}
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        hass.config.is_allowed_path.return_value = True
+        with patch("onstar_component.discovery"):
+            setup(hass, config)
+        return hass, next(
+            call[0][2]
+            for call in hass.services.register.call_args_list
+            if call[0][1] == "export_history"
+        )
+
+    def test_service_exports_recordings(self, recording, tmp_path):
+        hass, export = self._setup(tmp_path)
+        call = MagicMock()
+        call.data = {"filename": "out.ndjson", "format": "ndjson"}
+        export(call)
+        assert len(open(tmp_path / "out.ndjson").read().splitlines()) == 6
+
+    def test_recording_retention_is_configurable(self, tmp_path):
+        config = {DOMAIN: {
+            "username": "u", "password": "p", "record_dir": "recordings",
+            "record_max_bytes": 1000, "record_backup_count": 200}}
+        hass = MagicMock()
+        hass.data = {}
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        with patch("onstar_component.discovery"), patch(
+                "onstar_component.ResponseRecorder") as recorder:
+            setup(hass, config)
+        recorder.assert_called_once_with(
+            str(tmp_path / "recordings"), 1000, 200)
+
+    def test_service_requires_record_dir(self, tmp_path):
+        hass, export = self._setup(tmp_path, record_dir=None)
+        call = MagicMock()
+        call.data = {"filename": "out.ndjson"}
+        with patch("onstar_component.export_history") as mock_export:
+            export(call)
+        mock_export.assert_not_called()
+
+    def test_service_refuses_disallowed_path(self, recording, tmp_path):
+        hass, export = self._setup(tmp_path)
+        hass.config.is_allowed_path.return_value = False
+        call = MagicMock()
+        call.data = {"filename": "out.ndjson"}
+        export(call)
+        assert not (tmp_path / "out.ndjson").exists()
@@ -0,0 +1,170 @@
+"""Tests for fleet.py (fleet aggregates)."""
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from onstar_component import OnStarData
+from onstar_component.fleet import (
+    FLEET_DAILY_DISTANCE,
+    FLEET_LOWEST_FUEL,
+    FLEET_MAINTENANCE_DUE,
+    FLEET_SENSOR_TYPES,
+    FLEET_TIRE_ALERTS,
+    FLEET_WARNINGS,
+    FleetAggregator,
+)
+from onstar_component.sensor import OnStarFleetSensor, setup_platform
+
+MORNING = datetime(2025, 1, 15, 8).timestamp()
+EVENING = datetime(2025, 1, 15, 20).timestamp()
+NEXT_DAY = datetime(2025, 1, 16, 9).timestamp()
+
+
+class _Fleet:
+    """Feeds FleetAggregator the way OnStarData does, from full snapshots."""
+
+    def __init__(self, **kwargs):
+        self.aggregator = FleetAggregator(**kwargs)
+        self.status = {}
+
+    def report(self, vin, now=MORNING, **fields):
+        previous = self.status.get(vin, {})
+        status = dict(previous)
+        status.update({field.replace("_", "."): value for field, value in fields.items()})
+        changes = {
+            key: (previous.get(key), value) for key, value in status.items()
+            if previous.get(key) != value or key not in previous
+        }
+        self.status[vin] = status
+        self.aggregator.update(vin, changes, status, now)
+        return self.values(now)
+
+    def values(self, now):
+        with patch("onstar_component.fleet.time") as mock_time:
+            mock_time.time.return_value = now
+            return self.aggregator.values
+
+
+class TestFleetAggregator:
+    """Tests for the incremental aggregates."""
+
+    def test_lowest_fuel_follows_changes(self):
+        fleet = _Fleet()
+        fleet.report("A", onstar_fuellevel=50)
+        fleet.report("B", onstar_fuellevel=20)
+        assert fleet.aggregator.lowest_fuel == (20, "B")
+
+        fleet.report("B", onstar_fuellevel=80)
+        assert fleet.aggregator.lowest_fuel == (50, "A")
+        assert fleet.aggregator.attributes[FLEET_LOWEST_FUEL] == {"vin": "A"}
+
+    def test_fuel_heap_is_compacted(self):
+        fleet = _Fleet()
+        for level in range(100):
+            fleet.report("A", onstar_fuellevel=level % 50 + 1)
+        assert len(fleet.aggregator._fuel_heap) <= 18
+        assert fleet.aggregator.lowest_fuel == (50, "A")
+
+    def test_warning_and_tire_counters(self):
+        fleet = _Fleet()
+        fleet.report("A", onstar_warningcount=2, onstar_tirestatuslf=True)
+        values = fleet.report(
+            "B", onstar_warningcount=0, onstar_tirestatuslf=False,
+            onstar_tirestatusrr=False)
+        assert values[FLEET_WARNINGS] == 1
+        assert values[FLEET_TIRE_ALERTS] == 1
+
+        fleet.report("B", onstar_tirestatuslf=True)
+        assert fleet.aggregator.values[FLEET_TIRE_ALERTS] == 1
+        values = fleet.report("B", onstar_tirestatusrr=True)
+        assert values[FLEET_TIRE_ALERTS] == 0
+
+        values = fleet.report("A", onstar_warningcount=0)
+        assert values[FLEET_WARNINGS] == 0
+
+    def test_maintenance_due_within_distance(self):
+        fleet = _Fleet(maintenance_distance=500)
+        fleet.report("A", onstar_odometer=45000, onstar_nextmainodo=50000)
+        values = fleet.report("B", onstar_odometer=49600, onstar_nextmainodo=50000)
+        assert values[FLEET_MAINTENANCE_DUE] == 1
+        assert fleet.aggregator.attributes[FLEET_MAINTENANCE_DUE]["vins"] == ["B"]
+
+        values = fleet.report("B", onstar_nextmainodo=65000)
+        assert values[FLEET_MAINTENANCE_DUE] == 0
+
+    def test_daily_distance(self):
+        fleet = _Fleet()
+        fleet.report("A", onstar_odometer=45000)
+        fleet.report("B", onstar_odometer=10000)
+        fleet.report("A", now=EVENING, onstar_odometer=45100)
+        values = fleet.report("B", now=EVENING, onstar_odometer=10020)
+        assert values[FLEET_DAILY_DISTANCE] == 120
+
+        # Driving before the first report of the day still counts
+        values = fleet.report("A", now=NEXT_DAY, onstar_odometer=45130)
+        assert values[FLEET_DAILY_DISTANCE] == 30
+
+    def test_daily_distance_resets_at_midnight(self):
+        fleet = _Fleet()
+        fleet.report("A", onstar_odometer=45000)
+        fleet.report("A", now=EVENING, onstar_odometer=45100)
+        assert fleet.values(NEXT_DAY)[FLEET_DAILY_DISTANCE] == 0
+
+        # A report stamped before midnight does not bring the day back
+        values = fleet.report("A", now=EVENING, onstar_odometer=45100)
+        assert values[FLEET_DAILY_DISTANCE] == 0
+        values = fleet.report("A", now=NEXT_DAY, onstar_odometer=45130)
+        assert values[FLEET_DAILY_DISTANCE] == 30
+
+
+class TestFleetSensors:
+    """Tests for the fleet sensors."""
+
+    def test_created_only_when_enabled(self, mock_hass, mock_data):
+        added: list = []
+        add_entities = MagicMock(side_effect=lambda ents, update: added.extend(ents))
+        mock_data.fleet = FleetAggregator()
+
+        setup_platform(mock_hass, {}, add_entities)
+
+        fleet_sensors = [e for e in added if isinstance(e, OnStarFleetSensor)]
+        assert len(fleet_sensors) == len(FLEET_SENSOR_TYPES)
+        assert len(added) == len(mock_data.status) + len(FLEET_SENSOR_TYPES)
+
+    def test_value_and_attributes(self, mock_data):
+        fleet = _Fleet()
+        fleet.report("A", onstar_warningcount=1)
+        mock_data.fleet = fleet.aggregator
+
+        sensor = OnStarFleetSensor(mock_data, FLEET_WARNINGS)
+        sensor.update()
+
+        assert sensor._attr_name == "Vehicles with warnings"
+        assert sensor.native_value == 1
+        assert sensor.extra_state_attributes["vins"] == ["A"]
+
+    def test_daily_distance_entity_resets_at_midnight(self, mock_data):
+        fleet = _Fleet()
+        fleet.report("A", onstar_odometer=45000)
+        fleet.report("A", now=EVENING, onstar_odometer=45100)
+        mock_data.fleet = fleet.aggregator
+
+        sensor = OnStarFleetSensor(mock_data, FLEET_DAILY_DISTANCE)
+        with patch("onstar_component.fleet.time") as mock_time:
+            mock_time.time.return_value = EVENING
+            sensor.update()
+            assert sensor.native_value == 100
+
+            # Same revision, no report since midnight
+            mock_time.time.return_value = NEXT_DAY
+            sensor.update()
+        assert sensor.native_value == 0
+
+    def test_onstar_data_feeds_fleet(self):
+        fleet = FleetAggregator()
+        data = OnStarData("user", "pass", "1234", fleet=fleet)
+        data._get_status = MagicMock(side_effect=lambda wake=None: {
+            "onstar.vin": "A", "onstar.fuellevel": 40, "onstar.warningcount": 3})
+        data.update().result()
+        data.executor.shutdown(wait=True)
+        assert fleet.values[FLEET_LOWEST_FUEL] == 40
+        assert fleet.values[FLEET_WARNINGS] == 1
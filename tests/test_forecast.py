@@ -0,0 +1,135 @@
+"""Tests for forecast.py (maintenance forecasting)."""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from onstar_component import OnStarData
+from onstar_component.forecast import (
+    FORECAST_DISTANCE_PER_DAY,
+    FORECAST_NEXT_MAINTENANCE,
+    FORECAST_OIL_DEPLETION,
+    LinearTrend,
+    MaintenanceForecaster,
+)
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _status(odometer, oil, vin="VIN1", next_odometer=50000):
+    return {
+        "onstar.vin": vin,
+        "onstar.odometer": odometer,
+        "onstar.oillife": oil,
+        "onstar.nextmainodo": next_odometer,
+    }
+
+
+class TestLinearTrend:
+    """Tests for the incremental fit."""
+
+    def test_slope_of_exact_line(self):
+        trend = LinearTrend()
+        for x in range(10):
+            trend.add(1e6 + x, 3 * x + 7)
+        assert trend.slope == pytest.approx(3)
+        assert trend.span == 9
+
+    def test_needs_two_samples(self):
+        trend = LinearTrend()
+        assert trend.slope is None
+        trend.add(1, 1)
+        assert trend.slope is None
+
+    def test_out_of_order_samples_are_ignored(self):
+        trend = LinearTrend()
+        trend.add(0, 0)
+        trend.add(1, 10)
+        trend.add(1, 1000)
+        trend.add(0.5, 1000)
+        assert trend.count == 2
+        assert trend.slope == pytest.approx(10)
+
+
+class TestMaintenanceForecaster:
+    """Tests for the per vehicle forecasts."""
+
+    def test_no_forecast_before_min_span(self):
+        forecaster = MaintenanceForecaster()
+        forecaster.add(_status(45000, 80), START)
+        forecast = forecaster.add(_status(45010, 80), START + timedelta(hours=2))
+        assert forecast == {
+            FORECAST_DISTANCE_PER_DAY: None,
+            FORECAST_NEXT_MAINTENANCE: None,
+            FORECAST_OIL_DEPLETION: None,
+        }
+
+    def test_forecasts_from_trends(self):
+        forecaster = MaintenanceForecaster()
+        for day in range(5):
+            forecast = forecaster.add(
+                _status(45000 + 100 * day, 80 - 2 * day), START + timedelta(days=day))
+        assert forecast[FORECAST_DISTANCE_PER_DAY] == 100
+        # 45400 km on day 4, 4600 km left at 100 km per day
+        assert forecast[FORECAST_NEXT_MAINTENANCE] == "2025-02-20"
+        # 72% left on day 4, 2 points per day
+        assert forecast[FORECAST_OIL_DEPLETION] == "2025-02-10"
+
+    def test_oil_change_restarts_oil_trend(self):
+        forecaster = MaintenanceForecaster()
+        for day in range(3):
+            forecaster.add(_status(45000 + 100 * day, 10 - 2 * day), START + timedelta(days=day))
+        forecast = forecaster.add(_status(45300, 100), START + timedelta(days=3))
+        assert forecast[FORECAST_OIL_DEPLETION] is None
+        assert forecast[FORECAST_DISTANCE_PER_DAY] == 100
+
+        forecast = forecaster.add(_status(45400, 99), START + timedelta(days=4))
+        assert forecast[FORECAST_OIL_DEPLETION] == "2025-04-14"
+
+    def test_overdue_maintenance_is_due_now(self):
+        forecaster = MaintenanceForecaster()
+        forecaster.add(_status(49900, 50), START)
+        forecast = forecaster.add(_status(50100, 50), START + timedelta(days=2))
+        assert forecast[FORECAST_NEXT_MAINTENANCE] == "2025-01-03"
+        assert forecast[FORECAST_OIL_DEPLETION] is None
+
+    def test_vehicles_are_tracked_separately(self):
+        forecaster = MaintenanceForecaster()
+        forecaster.add(_status(45000, 80, vin="A"), START)
+        forecaster.add(_status(10000, 80, vin="B"), START)
+        forecast_a = forecaster.add(_status(45200, 80, vin="A"), START + timedelta(days=2))
+        forecast_b = forecaster.add(_status(10020, 80, vin="B"), START + timedelta(days=2))
+        assert forecast_a[FORECAST_DISTANCE_PER_DAY] == 100
+        assert forecast_b[FORECAST_DISTANCE_PER_DAY] == 10
+
+
+class TestOnStarDataForecast:
+    """Tests for forecasts in the snapshot."""
+
+    def test_forecast_sensor_types(self):
+        data = OnStarData("user", "pass", "1234")
+        for sensor_type in (
+            FORECAST_DISTANCE_PER_DAY,
+            FORECAST_NEXT_MAINTENANCE,
+            FORECAST_OIL_DEPLETION,
+        ):
+            assert sensor_type in data.SENSOR_TYPES
+        data.executor.shutdown()
+
+    def test_snapshot_carries_forecasts(self):
+        from .test_replay import DIAGNOSTICS, LOCATION, _response
+
+        client = MagicMock()
+        client.get_diagnostics.return_value = _response(DIAGNOSTICS)
+        client.get_location.return_value = _response(LOCATION)
+
+        async def refresh(wake=True):
+            pass
+
+        client.refresh = refresh
+        data = OnStarData("user", "pass", "1234", replay=client)
+        data.update().result()
+        data.executor.shutdown(wait=True)
+
+        assert data.status[FORECAST_DISTANCE_PER_DAY] is None
+        assert FORECAST_NEXT_MAINTENANCE in data.status
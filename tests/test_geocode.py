@@ -0,0 +1,92 @@
+"""Tests for geocode.py (offline reverse geocoding)."""
+from collections import namedtuple
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from onstar_component import OnStarData
+from onstar_component.geocode import ReverseGeocoder, coordinates, distance
+
+PLACES = [
+    (48.8566, 2.3522, "Hotel de Ville, Paris"),
+    (48.8584, 2.2945, "Eiffel Tower, Paris"),
+    (51.5074, -0.1278, "Trafalgar Square, London"),
+]
+
+
+class TestCoordinates:
+    """Tests for reading coordinates from location objects."""
+
+    def test_sequence(self):
+        assert coordinates((48.8566, 2.3522)) == (48.8566, 2.3522)
+
+    def test_named_fields(self):
+        Location = namedtuple("X", ["latitude", "longitude"])
+        assert coordinates(Location("48.1", "2.1")) == (48.1, 2.1)
+
+    def test_unreadable(self):
+        assert coordinates(None) is None
+        assert coordinates("x") is None
+
+
+class TestReverseGeocoder:
+    """Tests for nearest place lookups."""
+
+    def test_distance(self):
+        assert distance(48.8566, 2.3522, 48.8584, 2.2945) == pytest.approx(4230, rel=0.01)
+
+    def test_nearest_place(self):
+        geocoder = ReverseGeocoder(PLACES)
+        assert geocoder.lookup((48.8570, 2.3510)) == "Hotel de Ville, Paris"
+        assert geocoder.lookup((48.8580, 2.2950)) == "Eiffel Tower, Paris"
+
+    def test_nothing_within_max_distance(self):
+        geocoder = ReverseGeocoder(PLACES, max_distance=500)
+        assert geocoder.lookup((48.8700, 2.3300)) is None
+
+    def test_cell_lookups_are_cached(self):
+        geocoder = ReverseGeocoder(PLACES)
+        with patch.object(geocoder, "_nearest", wraps=geocoder._nearest) as nearest:
+            geocoder.lookup((48.85661, 2.35221))
+            geocoder.lookup((48.85662, 2.35219))
+        nearest.assert_called_once()
+        assert (geocoder.hits, geocoder.misses) == (1, 1)
+
+    def test_cache_is_lru_bounded(self):
+        geocoder = ReverseGeocoder(PLACES, cache_size=2)
+        geocoder.lookup((48.8566, 2.3522))
+        geocoder.lookup((48.8584, 2.2945))
+        geocoder.lookup((48.8566, 2.3522))
+        geocoder.lookup((51.5074, -0.1278))
+        assert list(geocoder._cache) == [(48.857, 2.352), (51.507, -0.128)]
+
+    def test_cache_entries_expire(self):
+        geocoder = ReverseGeocoder(PLACES, ttl=10)
+        with patch("onstar_component.geocode.time.monotonic", return_value=0):
+            geocoder.lookup((48.8566, 2.3522))
+        with patch("onstar_component.geocode.time.monotonic", return_value=11):
+            geocoder.lookup((48.8566, 2.3522))
+        assert geocoder.misses == 2
+
+    def test_from_csv(self, tmp_path):
+        path = tmp_path / "places.csv"
+        path.write_text(
+            "name,latitude,longitude,address\n"
+            "Home,48.8566,2.3522,1 Rue de Rivoli\n"
+            "Broken,,,\n"
+            "Work,48.8584,2.2945,\n")
+        geocoder = ReverseGeocoder.from_csv(str(path))
+        assert geocoder.lookup((48.8566, 2.3522)) == "1 Rue de Rivoli"
+        assert geocoder.lookup((48.8584, 2.2945)) == "Work"
+
+
+class TestOnStarDataAddress:
+    """Tests for the address exposed by OnStarData."""
+
+    def test_address_follows_location(self):
+        data = OnStarData("u", "p", "1234", geocoder=ReverseGeocoder(PLACES))
+        data._get_status = MagicMock(
+            return_value={"onstar.localization": (48.8566, 2.3522)})
+        data.update().result()
+        assert data.address == "Hotel de Ville, Paris"
+        data.executor.shutdown()
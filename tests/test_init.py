@@ -1,4 +1,7 @@
 """Tests for __init__.py (setup + OnStarData)."""
+import json
+import threading
+import time
 from datetime import datetime
 from unittest.mock import MagicMock, patch, PropertyMock
 
@@ -6,6 +9,7 @@ import pytest
 
 from onstar_component import setup, OnStarData
 from onstar_component.const import DOMAIN, ONSTAR_COMPONENTS
+from onstar_component.diagnostics import decode_section
 
 
 # ==========================================================================
@@ -55,10 +59,11 @@ class TestSetup:
         with patch("onstar_component.discovery"):
             setup(hass, valid_config)
 
-        hass.services.register.assert_called_once()
-        call_args = hass.services.register.call_args
-        assert call_args[0][0] == DOMAIN
-        assert call_args[0][1] == "update_state"
+        registered = {
+            call[0][1]: call for call in hass.services.register.call_args_list
+        }
+        assert "update_state" in registered
+        assert registered["update_state"][0][0] == DOMAIN
 
     def test_setup_loads_all_platforms(self, valid_config):
         hass = MagicMock()
@@ -113,8 +118,11 @@ class TestSetup:
             setup(hass, valid_config)
 
         # Extract the registered callback
-        register_call = hass.services.register.call_args
-        update_callback = register_call[0][2]
+        update_callback = next(
+            call[0][2]
+            for call in hass.services.register.call_args_list
+            if call[0][1] == "update_state"
+        )
 
         # Mock the data's update method
         hass.data[DOMAIN].update = MagicMock()
@@ -169,7 +177,7 @@ class TestOnStarData:
         """update() should delegate to _get_status()."""
         data = OnStarData("user", "pass", "1234")
         data._get_status = MagicMock(return_value={"onstar.plate": "XYZ"})
-        data.update()
+        data.update().result()
         data._get_status.assert_called_once()
         assert data.status == {"onstar.plate": "XYZ"}
 
@@ -177,7 +185,7 @@ class TestOnStarData:
         """If _get_status returns None (connection error), status should be None."""
         data = OnStarData("user", "pass", "1234")
         data._get_status = MagicMock(return_value=None)
-        data.update()
+        data.update().result()
         assert data.status is None
 
     def test_get_date_formatting(self):
@@ -226,12 +234,10 @@ class TestOnStarData:
         """_get_status should catch ConnectionResetError and return None."""
         data = OnStarData("user", "pass", "1234")
 
-        with patch("onstar_component.asyncio") as mock_asyncio:
-            mock_loop = MagicMock()
-            mock_asyncio.new_event_loop.return_value = mock_loop
-            mock_loop.run_until_complete.side_effect = ConnectionResetError("reset")
+        data._transport = MagicMock()
+        data._transport.run.side_effect = ConnectionResetError("reset")
 
-            result = data._get_status()
+        result = data._get_status()
 
         assert result is None
 
@@ -239,3 +245,583 @@ class TestOnStarData:
         """Data object should work fine with pin=None."""
         data = OnStarData("user", "pass", None)
         assert data._pin is None
+
+
+# ==========================================================================
+# Stale-while-revalidate tests
+# ==========================================================================
+
+
+class TestStaleWhileRevalidate:
+    """Tests for serving the last good snapshot while refreshing."""
+
+    @pytest.fixture()
+    def data(self):
+        data = OnStarData("user", "pass", "1234")
+        yield data
+        data.executor.shutdown(wait=True)
+
+    def test_failed_refresh_keeps_last_snapshot(self, data):
+        data._get_status = MagicMock(return_value={"onstar.plate": "XYZ"})
+        data.update().result()
+        data._get_status = MagicMock(return_value=None)
+        data.update(no_throttle=True).result()
+
+        assert data.status == {"onstar.plate": "XYZ"}
+        assert data.stale is True
+        assert data.expired is False
+
+    def test_due_refresh_does_not_turn_snapshot_stale(self, data):
+        from onstar_component import STALE_AFTER
+        from onstar_component.const import MIN_TIME_BETWEEN_UPDATES
+
+        data._get_status = MagicMock(return_value={"onstar.plate": "XYZ"})
+        data.update().result()
+        interval = MIN_TIME_BETWEEN_UPDATES.total_seconds()
+        with patch("onstar_component.time.monotonic",
+                   return_value=data._updated_at + interval + 30):
+            assert data.stale is False
+        with patch("onstar_component.time.monotonic",
+                   return_value=data._updated_at + STALE_AFTER.total_seconds() + 1):
+            assert data.stale is True
+
+    def test_snapshot_expires_after_max_staleness(self, data):
+        data._get_status = MagicMock(return_value={"onstar.plate": "XYZ"})
+        data.update().result()
+        assert data.stale is False
+
+        with patch("onstar_component.time.monotonic",
+                   return_value=data._updated_at + 3601):
+            assert data.data_age == pytest.approx(3601)
+            assert data.expired is True
+
+    def test_no_snapshot_is_expired(self, data):
+        assert data.data_age is None
+        assert data.expired is True
+
+    def test_schedule_refresh_runs_in_background(self, data):
+        release = threading.Event()
+
+        def slow_status(wake=None):
+            release.wait(5)
+            return {"onstar.plate": "XYZ"}
+
+        data._get_status = MagicMock(side_effect=slow_status)
+        data.schedule_refresh()
+        # Returns immediately while the refresh is still running
+        assert data.status is None
+        data.schedule_refresh()
+
+        release.set()
+        data._revalidation.result(5)
+        data._get_status.assert_called_once()
+        assert data.status == {"onstar.plate": "XYZ"}
+
+    def test_schedule_refresh_skips_recent_attempt(self, data):
+        data._get_status = MagicMock(return_value=None)
+        data.schedule_refresh()
+        data._revalidation.result(5)
+        data.schedule_refresh()
+        data._revalidation.result(5)
+        data._get_status.assert_called_once()
+
+
+# ==========================================================================
+# Incremental location tests
+# ==========================================================================
+
+
+def _fixes(*locations):
+    """Build a location report, newest first, like the OnStar server."""
+    report = []
+    for index, location in enumerate(locations):
+        entry = MagicMock()
+        entry.index = index
+        entry.location = location
+        report.append(entry)
+    return report
+
+
+class _CountingReport(list):
+    """List recording how many entries were iterated."""
+
+    def __iter__(self):
+        self.scanned = 0
+        for item in super().__iter__():
+            self.scanned += 1
+            yield item
+
+
+class TestIncrementalLocation:
+    """Tests for merging location fixes into the history."""
+
+    def test_first_report_only_keeps_latest_fix(self):
+        data = OnStarData("user", "pass", "1234")
+        report = _CountingReport(_fixes("c", "b", "a"))
+
+        assert data._get_location(report) == "c"
+        assert data.location_history == ["c"]
+        # Only the newest run is read
+        assert report.scanned == 3
+
+    def test_new_fixes_are_merged_in_order(self):
+        data = OnStarData("user", "pass", "1234")
+        data._get_location(_fixes("b", "a"))
+        report = _CountingReport(_fixes("d", "c", "b", "a", "z"))
+
+        assert data._get_location(report) == "d"
+        assert data.location_history == ["b", "c", "d"]
+        # Scanning stops once the last report's fixes matched
+        assert report.scanned == 4
+
+    def test_unchanged_report_stops_after_known_run(self):
+        data = OnStarData("user", "pass", "1234")
+        data._get_location(_fixes("b", "a"))
+        report = _CountingReport(_fixes("b", "a", "z"))
+
+        assert data._get_location(report) == "b"
+        assert data.location_history == ["b"]
+        assert report.scanned == 2
+
+    def test_return_to_known_spot_keeps_fixes_in_between(self):
+        data = OnStarData("user", "pass", "1234")
+        data._get_location(_fixes("P", "X"))
+
+        assert data._get_location(_fixes("P", "Q", "P", "X")) == "P"
+        assert data.location_history == ["P", "Q", "P"]
+        # The next report overlaps with this one, not with the first
+        data._get_location(_fixes("R", "P", "Q", "P", "X"))
+        assert data.location_history == ["P", "Q", "P", "R"]
+
+    def test_unknown_last_fix_merges_whole_report(self):
+        data = OnStarData("user", "pass", "1234")
+        data._get_location(_fixes("x"))
+
+        data._get_location(_fixes("c", "b"))
+        assert data.location_history == ["x", "b", "c"]
+        assert data.gps_position == "c"
+
+    def test_history_is_bounded(self):
+        from onstar_component.const import LOCATION_HISTORY_SIZE
+
+        data = OnStarData("user", "pass", "1234")
+        data._get_location(_fixes("start"))
+        report = _fixes(*range(LOCATION_HISTORY_SIZE * 2), "start")
+        data._get_location(report)
+        assert len(data.location_history) == LOCATION_HISTORY_SIZE
+        assert data.location_history[-1] == 0
+
+
+# ==========================================================================
+# Unchanged report tests
+# ==========================================================================
+
+
+class TestUnchangedReport:
+    """Tests for skipping extraction when the cloud report is unchanged."""
+
+    @pytest.fixture()
+    def client(self):
+        from .test_replay import DIAGNOSTICS, LOCATION, _response
+
+        client = MagicMock()
+        client.get_diagnostics.return_value = _response(DIAGNOSTICS)
+        client.get_location.return_value = _response(LOCATION)
+        return client
+
+    @pytest.fixture()
+    def data(self, client):
+        async def refresh(wake=True):
+            pass
+
+        client.refresh = refresh
+        data = OnStarData("user", "pass", "1234", replay=client)
+        yield data
+        data.executor.shutdown(wait=True)
+
+    def test_unchanged_report_skips_extraction(self, data):
+        data.update().result()
+        first = data.status
+        assert data.revision == 1
+
+        with patch("onstar_component.extract_status") as mock_extract:
+            data.update(no_throttle=True).result()
+        mock_extract.assert_not_called()
+        assert data.status is first
+        assert data.revision == 1
+        assert data.stale is False
+
+    def test_new_updated_on_is_extracted(self, data, client):
+        from .test_replay import DIAGNOSTICS, _response
+
+        data.update().result()
+        changed_at = data.last_changed("onstar.odometer")
+
+        report = json.loads(json.dumps(DIAGNOSTICS))
+        report["results"][0]["updatedOn"] = "2019-10-16T11:54:52.535+02:00"
+        report["results"][0]["reportData"]["metrics"]["odometer"] = 45100
+        client.get_diagnostics.return_value = _response(report)
+        with patch("onstar_component.time.time", return_value=changed_at + 60):
+            data.update(no_throttle=True).result()
+
+        assert data.revision == 2
+        assert data.status["onstar.odometer"] == 45100
+        assert data.last_changed("onstar.odometer") == changed_at + 60
+        # Fields with the same value keep their timestamp
+        assert data.last_changed("onstar.plate") == changed_at
+
+    def test_new_fix_is_extracted(self, data, client):
+        from .test_replay import _response
+
+        data.update().result()
+        client.get_location.return_value = _response(
+            {"results": [{"index": 0, "location": [1.0, 2.0]}]})
+        data.update(no_throttle=True).result()
+
+        assert data.revision == 2
+        assert data.status["onstar.localization"] == [1.0, 2.0]
+
+    def test_unchanged_report_feeds_parking(self, data):
+        from onstar_component.parking import ParkingClusterer
+
+        data.parking = ParkingClusterer()
+        with patch("onstar_component.time.time", return_value=1000.0):
+            data.update().result()
+        with patch("onstar_component.time.time", return_value=4600.0):
+            data.update(no_throttle=True).result()
+
+        assert data.revision == 1
+        assert data.parking.parked_at("VIN1")["dwell_hours"] == 1.0
+
+    def test_failed_extraction_is_retried(self, data, client):
+        from .test_replay import DIAGNOSTICS, _response
+
+        data.update().result()
+        report = json.loads(json.dumps(DIAGNOSTICS))
+        report["results"][0]["updatedOn"] = "2019-10-16T11:54:52.535+02:00"
+        report["results"][0]["reportData"]["metrics"]["odometer"] = 45100
+        client.get_diagnostics.return_value = _response(report)
+        with patch("onstar_component.extract_status",
+                   side_effect=ValueError("bad report")):
+            with pytest.raises(ValueError):
+                data.update(no_throttle=True).result()
+
+        data.update(no_throttle=True).result()
+        assert data.status["onstar.odometer"] == 45100
+        assert data.revision == 2
+
+
+# ==========================================================================
+# Wake-up policy tests
+# ==========================================================================
+
+
+class TestWakePolicy:
+    """Tests for choosing between cloud cache reads and vehicle wake-ups."""
+
+    @pytest.fixture()
+    def data(self):
+        from datetime import timedelta
+
+        data = OnStarData(
+            "user", "pass", "1234", wake_interval=timedelta(hours=6))
+        yield data
+        data.executor.shutdown(wait=True)
+
+    def test_first_refresh_wakes(self, data):
+        assert data._wake_due() is True
+
+    def test_parked_car_is_not_woken_within_interval(self, data):
+        data._woken_at = time.monotonic()
+        data._status = {"onstar.ignition": "OFF"}
+        assert data._wake_due() is False
+
+    def test_parked_car_is_woken_after_interval(self, data):
+        data._woken_at = time.monotonic() - 6 * 3600
+        data._status = {"onstar.ignition": "OFF"}
+        assert data._wake_due() is True
+
+    def test_running_car_may_be_woken(self, data):
+        data._woken_at = time.monotonic()
+        data._status = {"onstar.ignition": "ON"}
+        assert data._wake_due() is True
+
+    def test_zero_interval_disables_policy(self):
+        from datetime import timedelta
+
+        data = OnStarData("user", "pass", "1234", wake_interval=timedelta(0))
+        data._woken_at = time.monotonic() - 100 * 3600
+        data._status = {"onstar.ignition": "OFF"}
+        assert data._wake_due() is False
+
+    def test_cheap_refresh_keeps_last_fix(self, data):
+        from .test_replay import DIAGNOSTICS, LOCATION, _response
+
+        client = MagicMock()
+        wakes = []
+
+        async def refresh(wake=True):
+            wakes.append(wake)
+            client.get_location.return_value = (
+                _response(LOCATION) if wake else None)
+
+        client.refresh = refresh
+        client.get_diagnostics.return_value = _response(DIAGNOSTICS)
+        data._replay = client
+
+        data.update().result()
+        report = json.loads(json.dumps(DIAGNOSTICS))
+        report["results"][0]["updatedOn"] = "2019-10-16T11:54:52.535+02:00"
+        client.get_diagnostics.return_value = _response(report)
+        data.update(no_throttle=True).result()
+
+        assert wakes == [True, False]
+        assert data.status["onstar.localization"] == [48.8566, 2.3522]
+        assert data.revision == 2
+
+    def test_update_service_wakes_vehicle(self):
+        hass = MagicMock()
+        hass.data = {}
+        with patch("onstar_component.discovery"):
+            setup(hass, {DOMAIN: {"username": "u", "password": "p"}})
+        update_callback = next(
+            call[0][2]
+            for call in hass.services.register.call_args_list
+            if call[0][1] == "update_state"
+        )
+        hass.data[DOMAIN].update = MagicMock()
+        update_callback(MagicMock())
+        hass.data[DOMAIN].update.assert_called_once_with(
+            no_throttle=True, wake=True)
+
+
+# ==========================================================================
+# Shared initial fetch tests
+# ==========================================================================
+
+
+class TestInitialFetch:
+    """Tests for the single fetch shared by all platforms at boot."""
+
+    def test_setup_starts_initial_fetch(self):
+        hass = MagicMock()
+        hass.data = {}
+        with patch("onstar_component.discovery"), patch.object(
+            OnStarData, "start_initial_fetch"
+        ) as mock_start:
+            setup(hass, {DOMAIN: {"username": "u", "password": "p"}})
+        mock_start.assert_called_once()
+
+    def test_concurrent_platforms_share_one_fetch(self):
+        data = OnStarData("user", "pass", "1234")
+        release = threading.Event()
+
+        def slow_status(wake=None):
+            release.wait(5)
+            return {"onstar.plate": "XYZ"}
+
+        data._get_status = MagicMock(side_effect=slow_status)
+        waiters = [
+            threading.Thread(target=data.wait_for_initial_fetch) for _ in range(2)
+        ]
+        for waiter in waiters:
+            waiter.start()
+        # Entity updates meanwhile do not queue another fetch
+        data.schedule_refresh()
+        release.set()
+        for waiter in waiters:
+            waiter.join(5)
+
+        data._get_status.assert_called_once()
+        assert data.status == {"onstar.plate": "XYZ"}
+        data.executor.shutdown()
+
+    def test_wait_times_out(self):
+        data = OnStarData("user", "pass", "1234")
+        release = threading.Event()
+        data._get_status = MagicMock(side_effect=lambda wake=None: release.wait(5))
+        with patch("onstar_component._LOGGER") as logger:
+            data.wait_for_initial_fetch(timeout=0.01)
+        logger.warning.assert_called_once()
+        release.set()
+        data.executor.shutdown(wait=True)
+
+
+class TestSelectiveFields:
+    """Tests for configured sensor types and platforms."""
+
+    @pytest.fixture()
+    def client(self):
+        from .test_replay import DIAGNOSTICS, LOCATION, _response
+
+        client = MagicMock()
+        client.get_diagnostics.return_value = _response(DIAGNOSTICS)
+        client.get_location.return_value = _response(LOCATION)
+        client.wakes = []
+
+        async def refresh(wake=True):
+            client.wakes.append(wake)
+
+        client.refresh = refresh
+        return client
+
+    def _setup(self, **options):
+        hass = MagicMock()
+        hass.data = {}
+        config = {DOMAIN: {"username": "u", "password": "p", **options}}
+        with patch("onstar_component.discovery") as mock_discovery:
+            setup(hass, config)
+        hass.data[DOMAIN].executor.shutdown(wait=True)
+        return hass.data[DOMAIN], [
+            call[0][1] for call in mock_discovery.load_platform.call_args_list
+        ]
+
+    def test_only_configured_platforms_are_loaded(self):
+        data, loaded = self._setup(platforms=["sensor"], sensors=["onstar.fuellevel"])
+        assert loaded == ["sensor"]
+        assert data.fields == {"onstar.fuellevel"}
+        assert data._locate is False
+
+    def test_localization_sensor_needs_location(self):
+        data, _ = self._setup(
+            platforms=["sensor"], sensors=["onstar.localization"])
+        assert data._locate is True
+
+    def test_tracker_only_needs_location(self):
+        data, loaded = self._setup(platforms=["device_tracker"])
+        assert loaded == ["device_tracker"]
+        assert data.fields == frozenset()
+        assert data._locate is True
+
+    def test_only_selected_fields_are_extracted(self, client):
+        data = OnStarData(
+            "user", "pass", "1234", replay=client,
+            fields=["onstar.fuellevel"], locate=False)
+        data.update().result()
+        data.executor.shutdown(wait=True)
+
+        assert set(data.status) == {"onstar.fuellevel", "onstar.vin"}
+        assert client.wakes == [False]
+
+    def test_tracker_works_on_pruned_status(self, client):
+        from onstar_component.device_tracker import OnstarDeviceTracker
+
+        data = OnStarData(
+            "user", "pass", "1234", replay=client, fields=[], locate=True)
+        data.update().result()
+        data.executor.shutdown(wait=True)
+        see = MagicMock()
+
+        OnstarDeviceTracker(see, data).update()
+
+        assert see.call_args[1]["host_name"] == "ABC1234"
+        assert see.call_args[1]["attributes"]["vin"] == "VIN1"
+
+    def test_forecast_pulls_in_its_inputs(self, client):
+        data = OnStarData(
+            "user", "pass", "1234", replay=client,
+            fields=["onstar.distanceperday"], locate=False)
+        data.update().result()
+        data.executor.shutdown(wait=True)
+
+        assert {"onstar.odometer", "onstar.oillife", "onstar.distanceperday"} <= set(
+            data.status)
+
+    def test_all_fields_by_default(self, client):
+        data = OnStarData("user", "pass", "1234", replay=client)
+        data.update().result()
+        data.executor.shutdown(wait=True)
+
+        assert data.fields == set(data.SENSOR_TYPES)
+        assert "onstar.localization" in data.status
+        assert client.wakes == [True]
+
+    def test_unknown_sensor_type_is_logged(self):
+        with patch("onstar_component._LOGGER") as logger:
+            data = OnStarData("user", "pass", "1234", fields=["onstar.bogus"])
+        logger.warning.assert_called_once()
+        data.executor.shutdown()
+
+
+class TestReportSections:
+    """Tests for the raw report kept for on demand sections."""
+
+    @pytest.fixture()
+    def client(self):
+        from .test_replay import DIAGNOSTICS, _response
+
+        report = json.loads(json.dumps(DIAGNOSTICS))
+        report["results"][0]["reportData"]["sections"].update({
+            "brakes": {"status": "YELLOW", "details": {"padWear": 0.8}},
+            "lighting": {"status": "GREEN"},
+        })
+        client = MagicMock()
+        client.get_diagnostics.return_value = _response(report)
+        client.get_location.return_value = None
+
+        async def refresh(wake=True):
+            pass
+
+        client.refresh = refresh
+        return client
+
+    def _data(self, client, **kwargs):
+        data = OnStarData("user", "pass", "1234", replay=client, **kwargs)
+        data.update().result()
+        data.executor.shutdown(wait=True)
+        return data
+
+    def test_sections_without_sensor_are_listed(self, client):
+        data = self._data(client)
+        assert data.report_sections() == ["brakes", "lighting"]
+        assert data.report_sections("OTHER") == []
+
+    def test_section_is_decoded_on_demand(self, client):
+        data = self._data(client)
+        with patch("onstar_component.decode_section", wraps=decode_section) as decode:
+            assert data.section("brakes") == {
+                "status": "YELLOW", "details": {"padWear": 0.8}}
+        decode.assert_called_once()
+        assert data.section("missing") is None
+
+    def test_configured_sensors_limit_sections(self, client):
+        data = self._data(
+            client, fields=["onstar.fuellevel", "onstar.section.lighting"])
+        assert data.report_sections() == ["lighting"]
+
+
+class TestRefreshSerialization:
+    """Tests for refreshes never overlapping."""
+
+    def test_update_and_revalidation_do_not_overlap(self):
+        data = OnStarData("user", "pass", "1234")
+        running = []
+        overlaps = []
+        started = threading.Event()
+
+        def slow_status(wake=None):
+            overlaps.append(len(running))
+            running.append(1)
+            started.set()
+            time.sleep(0.05)
+            running.pop()
+            return {"onstar.plate": "XYZ"}
+
+        data._get_status = MagicMock(side_effect=slow_status)
+        data.schedule_refresh()
+        started.wait(5)
+        data.update(no_throttle=True).result()
+        data.executor.shutdown(wait=True)
+
+        assert data._get_status.call_count == 2
+        assert overlaps == [0, 0]
+
+    def test_revalidation_errors_are_reported(self):
+        data = OnStarData("user", "pass", "1234")
+        data._get_status = MagicMock(side_effect=ValueError("bad report"))
+        data._updated_at = time.monotonic()
+        with patch("onstar_component._LOGGER") as logger:
+            data.schedule_refresh()
+            data.executor.shutdown(wait=True)
+        logger.error.assert_called_once()
+        assert data.stale is True
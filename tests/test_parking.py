@@ -0,0 +1,95 @@
+"""Tests for parking.py (parking spot clustering)."""
+from unittest.mock import MagicMock
+
+from onstar_component import OnStarData
+from onstar_component.parking import ParkingClusterer
+
+HOME = (48.85660, 2.35220)
+HOME_NEARBY = (48.85670, 2.35230)
+WORK = (48.87380, 2.29500)
+HOUR = 3600
+
+
+def _park(parking, location, start, hours=1, vin="VIN1"):
+    """Drive to location and stay parked there for hours."""
+    parking.add(vin, None, "ON", start - 60)
+    for hour in range(hours + 1):
+        parking.add(vin, location, "OFF", start + hour * HOUR)
+    return start + (hours + 1) * HOUR
+
+
+class TestParkingClusterer:
+    """Tests for the online clustering."""
+
+    def test_visits_are_counted_once_per_stop(self):
+        parking = ParkingClusterer(min_visits=1)
+        _park(parking, HOME, 0, hours=3)
+        (zone,) = parking.suggested_zones("VIN1")
+        assert zone["visits"] == 1
+        assert zone["dwell_hours"] == 3
+        assert parking.parked_at("VIN1")["name"] == "Parking 1"
+
+    def test_nearby_fixes_share_a_spot(self):
+        parking = ParkingClusterer(min_visits=1)
+        now = _park(parking, HOME, 0)
+        now = _park(parking, HOME_NEARBY, now)
+        now = _park(parking, WORK, now)
+
+        zones = parking.suggested_zones("VIN1")
+        assert [zone["visits"] for zone in zones] == [2, 1]
+        assert zones[0]["latitude"] == round((HOME[0] + HOME_NEARBY[0]) / 2, 6)
+        assert parking.parked_at("VIN1")["name"] == "Parking 2"
+
+    def test_driving_clears_parked_at(self):
+        parking = ParkingClusterer()
+        _park(parking, HOME, 0)
+        parking.add("VIN1", WORK, "ON", 10 * HOUR)
+        assert parking.parked_at("VIN1") is None
+        assert parking.attributes("VIN1") == {
+            "parked_at": None, "suggested_zones": []}
+
+    def test_only_frequent_spots_are_suggested(self):
+        parking = ParkingClusterer(min_visits=3)
+        now = 0
+        for _ in range(3):
+            now = _park(parking, HOME, now)
+        now = _park(parking, WORK, now)
+        assert [zone["name"] for zone in parking.suggested_zones("VIN1")] == [
+            "Parking 1"]
+
+    def test_memory_is_bounded_and_frequent_spots_stay(self):
+        parking = ParkingClusterer(max_spots=3, min_visits=2)
+        now = 0
+        for _ in range(2):
+            now = _park(parking, HOME, now)
+        for i in range(20):
+            now = _park(parking, (50 + i * 0.1, 3.0), now)
+
+        assert len(parking._vehicles["VIN1"].spots) == 3
+        (zone,) = parking.suggested_zones("VIN1")
+        assert zone["visits"] == 2
+        assert zone["name"] == "Parking 1"
+
+    def test_vehicles_are_separate(self):
+        parking = ParkingClusterer(min_visits=1)
+        _park(parking, HOME, 0, vin="A")
+        assert parking.suggested_zones("B") == []
+        assert parking.parked_at("B") is None
+
+
+class TestOnStarDataParking:
+    """Tests for parking spots fed from refreshes."""
+
+    def test_refresh_feeds_parking(self):
+        data = OnStarData("user", "pass", "1234")
+        data._get_status = MagicMock(side_effect=lambda wake=None: {
+            "onstar.vin": "VIN1", "onstar.ignition": "OFF",
+            "onstar.localization": HOME})
+        data.update().result()
+        data.executor.shutdown(wait=True)
+        assert data.parking.parked_at("VIN1")["name"] == "Parking 1"
+
+    def test_no_parking_without_location(self):
+        data = OnStarData("user", "pass", "1234", fields=[], locate=False)
+        assert data.parking is None
+        data.executor.shutdown()
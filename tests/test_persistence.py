@@ -0,0 +1,226 @@
+"""Tests for persistence.py (delta encoded state file)."""
+import json
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from onstar_component import OnStarData, setup
+from onstar_component.const import DOMAIN
+from onstar_component.persistence import DeltaStore
+
+SNAPSHOT = {
+    "onstar.vin": "VIN1",
+    "onstar.odometer": 45000,
+    "onstar.fuellevel": 72,
+    "onstar.localization": (48.8566, 2.3522),
+}
+
+
+def _lines(path):
+    return [json.loads(line) for line in open(path, encoding="utf-8")]
+
+
+@pytest.fixture()
+def path(tmp_path):
+    return str(tmp_path / "onstar_state.ndjson")
+
+
+class TestDeltaStore:
+    """Tests for recording, flushing and restoring snapshots."""
+
+    def test_first_record_is_a_checkpoint_then_deltas(self, path):
+        store = DeltaStore(path)
+        store.record("VIN1", SNAPSHOT, 100)
+        store.record("VIN1", dict(SNAPSHOT, **{"onstar.odometer": 45100}), 200)
+        store.flush()
+
+        first, second = _lines(path)
+        assert first["full"] is True
+        assert first["data"]["onstar.localization"] == [48.8566, 2.3522]
+        assert second == {"ts": 200, "vin": "VIN1", "data": {"onstar.odometer": 45100}}
+
+    def test_unchanged_snapshot_writes_nothing(self, path):
+        store = DeltaStore(path)
+        store.record("VIN1", SNAPSHOT, 100)
+        store.record("VIN1", dict(SNAPSHOT), 200)
+        assert store.pending == 1
+
+    def test_flush_coalesces_into_one_write(self, path):
+        store = DeltaStore(path)
+        for i in range(10):
+            store.record("VIN1", dict(SNAPSHOT, **{"onstar.odometer": 45000 + i}), i)
+        with patch("onstar_component.persistence.os.fsync") as fsync:
+            store.flush()
+            store.flush()
+        fsync.assert_called_once()
+        assert store.writes == 1
+        assert len(_lines(path)) == 10
+
+    def test_periodic_checkpoints(self, path):
+        store = DeltaStore(path, checkpoint_every=3)
+        for i in range(7):
+            store.record("VIN1", dict(SNAPSHOT, **{"onstar.odometer": 45000 + i}), i)
+        store.flush()
+        assert [bool(r.get("full")) for r in _lines(path)] == [
+            True, False, False, True, False, False, True]
+
+    def test_restore_replays_deltas(self, path):
+        store = DeltaStore(path)
+        store.record("VIN1", SNAPSHOT, 100)
+        changed = dict(SNAPSHOT, **{"onstar.fuellevel": 50})
+        del changed["onstar.localization"]
+        store.record("VIN1", changed, 200)
+        store.record("VIN2", {"onstar.vin": "VIN2", "onstar.odometer": 10}, 150)
+        store.flush()
+        with open(path, "a", encoding="utf-8") as fp:
+            fp.write('{"ts": 300, "vin": "VIN1", "da')
+
+        restored = DeltaStore(path).restore()
+        assert restored["VIN1"] == (200, {
+            "onstar.vin": "VIN1", "onstar.odometer": 45000, "onstar.fuellevel": 50})
+        assert restored["VIN2"][0] == 150
+
+    def test_records_after_torn_tail_survive(self, path):
+        store = DeltaStore(path)
+        store.record("VIN1", dict(SNAPSHOT, **{"onstar.fuellevel": 50}), 100)
+        store.flush()
+        with open(path, "a", encoding="utf-8") as fp:
+            fp.write('{"ts": 150, "vin": "VIN1", "da')
+
+        store = DeltaStore(path)
+        store.restore()
+        store.record("VIN1", dict(SNAPSHOT, **{"onstar.fuellevel": 20}), 200)
+        store.flush()
+        store.record("VIN1", dict(SNAPSHOT, **{
+            "onstar.fuellevel": 20, "onstar.odometer": 45100}), 300)
+        store.flush()
+
+        assert len(_lines(path)) == 3
+        ts, snapshot = DeltaStore(path).restore()["VIN1"]
+        assert ts == 300
+        assert snapshot["onstar.fuellevel"] == 20
+        assert snapshot["onstar.odometer"] == 45100
+
+    def test_torn_file_without_newline_is_emptied(self, path):
+        with open(path, "w", encoding="utf-8") as fp:
+            fp.write('{"ts": 150, "vin": "VIN1", "da')
+        assert DeltaStore(path).restore() == {}
+        assert os.path.getsize(path) == 0
+
+    def test_restored_store_continues_with_deltas(self, path):
+        store = DeltaStore(path)
+        store.record("VIN1", SNAPSHOT, 100)
+        store.flush()
+
+        store = DeltaStore(path)
+        store.restore()
+        store.record("VIN1", dict(SNAPSHOT, **{"onstar.fuellevel": 10}), 200)
+        store.flush()
+        assert _lines(path)[-1]["data"] == {"onstar.fuellevel": 10}
+
+    def test_compacts_past_max_bytes(self, path):
+        store = DeltaStore(path, max_bytes=2000)
+        for i in range(100):
+            store.record("VIN1", dict(SNAPSHOT, **{"onstar.odometer": 45000 + i}), i)
+            store.flush()
+
+        assert os.path.getsize(path) <= 2000
+        assert _lines(path)[0]["full"] is True
+        restored = DeltaStore(path).restore()
+        assert restored["VIN1"] == (99, dict(
+            SNAPSHOT, **{"onstar.odometer": 45099, "onstar.localization": [48.8566, 2.3522]}))
+
+    def test_failed_write_is_retried(self, path, tmp_path):
+        store = DeltaStore(str(tmp_path / "missing" / "state.ndjson"))
+        store.record("VIN1", SNAPSHOT, 100)
+        store.flush()
+        assert store.pending == 1
+
+
+class TestOnStarDataPersistence:
+    """Tests for persisting and restoring OnStarData snapshots."""
+
+    def test_refresh_records_snapshot(self, path):
+        store = DeltaStore(path)
+        data = OnStarData("user", "pass", "1234", store=store)
+        data._get_status = MagicMock(side_effect=lambda wake=None: dict(SNAPSHOT))
+        data.update().result()
+        data.executor.shutdown(wait=True)
+        store.flush()
+        assert _lines(path)[0]["vin"] == "VIN1"
+
+    def test_restore_serves_snapshot(self):
+        data = OnStarData("user", "pass", "1234")
+        data.restore({"VIN1": (time.time() - 120, dict(SNAPSHOT))})
+        assert data.status["onstar.odometer"] == 45000
+        assert data.gps_position == (48.8566, 2.3522)
+        assert 119 < data.data_age < 130
+        assert data.revision == 1
+        data.executor.shutdown()
+
+    def test_object_fix_round_trips_as_coordinates(self, path):
+        from collections import namedtuple
+
+        fix = namedtuple("X", ["lat", "lon", "accuracy"])(48.8566, 2.3522, 10)
+        live = dict(SNAPSHOT, **{"onstar.localization": fix})
+        store = DeltaStore(path)
+        data = OnStarData("user", "pass", "1234", store=store)
+        data._get_status = MagicMock(side_effect=lambda wake=None: dict(live))
+        data.update().result()
+        store.flush()
+        assert _lines(path)[0]["data"]["onstar.localization"] == [48.8566, 2.3522]
+        data.executor.shutdown(wait=True)
+
+        snapshots = DeltaStore(path).restore()
+        data = OnStarData("user", "pass", "1234")
+        data.restore(snapshots)
+        assert data.gps_position == (48.8566, 2.3522)
+        data._get_status = MagicMock(side_effect=lambda wake=None: dict(live))
+        with patch("onstar_component.time.time", return_value=time.time() + 60):
+            data.update(no_throttle=True).result()
+        data.executor.shutdown(wait=True)
+        # The same fix after the restart is not a change
+        assert data.last_changed("onstar.localization") == snapshots["VIN1"][0]
+
+    def test_restore_seeds_derived_state(self):
+        from onstar_component.fleet import FleetAggregator
+
+        geocoder = MagicMock()
+        geocoder.lookup.return_value = "Paris"
+        fleet = FleetAggregator()
+        data = OnStarData(
+            "user", "pass", "1234", fleet=fleet, geocoder=geocoder)
+        snapshot = dict(SNAPSHOT, **{
+            "onstar.warningcount": 1, "onstar.ignition": "OFF"})
+        data.restore({"VIN1": (time.time() - 60, snapshot)})
+
+        # An identical report after the restart changes nothing derived
+        data._get_status = MagicMock(side_effect=lambda wake=None: dict(snapshot))
+        data.update().result()
+        data.executor.shutdown(wait=True)
+
+        assert data.address == "Paris"
+        assert fleet.values["fleet.lowestfuel"] == 72
+        assert fleet.values["fleet.warnings"] == 1
+        assert data.parking.parked_at("VIN1")["visits"] == 1
+
+    def test_setup_restores_and_flushes_periodically(self, path, tmp_path):
+        store = DeltaStore(path)
+        store.record("VIN1", SNAPSHOT, time.time())
+        store.flush()
+
+        hass = MagicMock()
+        hass.data = {}
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        with patch("onstar_component.discovery"), patch(
+            "onstar_component.track_time_interval"
+        ) as track, patch.object(OnStarData, "start_initial_fetch"):
+            setup(hass, {DOMAIN: {
+                "username": "u", "password": "p", "state_file": "onstar_state.ndjson"}})
+
+        data = hass.data[DOMAIN]
+        assert data.status["onstar.fuellevel"] == 72
+        track.assert_called_once()
+        data.executor.shutdown()
@@ -0,0 +1,127 @@
+"""Tests for profiler.py (on-demand cycle profiling)."""
+import os
+import pstats
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from onstar_component import OnStarData, setup
+from onstar_component.const import DOMAIN
+from onstar_component.profiler import MODE_CPROFILE, MODE_SAMPLE, CycleProfiler
+
+
+def _busy_cycle():
+    deadline = time.monotonic() + 0.05
+    while time.monotonic() < deadline:
+        sum(range(100))
+
+
+def _thread_work():
+    sum(range(1000))
+
+
+class TestCycleProfiler:
+    """Tests for the profiler itself."""
+
+    def test_inactive_cycle_does_nothing(self, tmp_path):
+        profiler = CycleProfiler()
+        with profiler.cycle():
+            pass
+        assert os.listdir(tmp_path) == []
+
+    def test_cprofile_reports_after_n_cycles(self, tmp_path):
+        profiler = CycleProfiler()
+        report = MagicMock()
+        profiler.start(2, MODE_CPROFILE, str(tmp_path), report)
+
+        with profiler.cycle():
+            _busy_cycle()
+        report.assert_not_called()
+        assert profiler.active
+
+        with profiler.cycle():
+            _busy_cycle()
+        report.assert_called_once()
+        assert not profiler.active
+
+        (name,) = os.listdir(tmp_path)
+        assert name.endswith(".prof")
+        assert "_busy_cycle" in report.call_args[0][0]
+
+    def test_sample_mode_writes_text_report(self, tmp_path):
+        profiler = CycleProfiler()
+        report = MagicMock()
+        profiler.start(1, MODE_SAMPLE, str(tmp_path), report)
+
+        with profiler.cycle():
+            _busy_cycle()
+
+        (name,) = os.listdir(tmp_path)
+        assert name.endswith(".txt")
+        content = open(tmp_path / name).read()
+        assert content.startswith("samples: ")
+        assert "_busy_cycle" in content
+        report.assert_called_once()
+
+    def test_thread_profile_joins_running_cycle(self, tmp_path):
+        profiler = CycleProfiler()
+        report = MagicMock()
+        profiler.start(1, MODE_CPROFILE, str(tmp_path), report)
+
+        def transport_request():
+            with profiler.thread_profile():
+                _thread_work()
+
+        with profiler.cycle():
+            worker = threading.Thread(target=transport_request)
+            worker.start()
+            worker.join()
+
+        (name,) = os.listdir(tmp_path)
+        stats = pstats.Stats(str(tmp_path / name))
+        assert any(key[2] == "_thread_work" for key in stats.stats)
+
+    def test_thread_profile_idle_without_cycle(self, tmp_path):
+        profiler = CycleProfiler()
+        profiler.start(1, MODE_CPROFILE, str(tmp_path))
+        with profiler.thread_profile():
+            _thread_work()
+        assert profiler.active
+        assert os.listdir(tmp_path) == []
+
+    def test_start_refused_while_running(self, tmp_path):
+        profiler = CycleProfiler()
+        assert profiler.start(1, MODE_CPROFILE, str(tmp_path))
+        assert not profiler.start(1, MODE_CPROFILE, str(tmp_path))
+
+
+class TestProfileService:
+    """Tests for the profile service."""
+
+    def test_service_profiles_refresh_cycles(self, tmp_path):
+        hass = MagicMock()
+        hass.data = {}
+        hass.config.path = lambda *parts: str(tmp_path.joinpath(*parts))
+        with patch("onstar_component.discovery"):
+            setup(hass, {DOMAIN: {"username": "u", "password": "p"}})
+        profile = next(
+            call[0][2]
+            for call in hass.services.register.call_args_list
+            if call[0][1] == "profile"
+        )
+
+        call = MagicMock()
+        call.data = {"cycles": 1, "mode": MODE_CPROFILE}
+        profile(call)
+
+        data: OnStarData = hass.data[DOMAIN]
+        data._get_status = MagicMock(return_value={"onstar.plate": "XYZ"})
+        with patch(
+            "onstar_component.persistent_notification.create"
+        ) as mock_create:
+            data.update().result()
+        data.executor.shutdown(wait=True)
+
+        mock_create.assert_called_once()
+        assert mock_create.call_args[1]["notification_id"] == "onstar_profile"
+        assert any(name.endswith(".prof") for name in os.listdir(tmp_path))
@@ -0,0 +1,234 @@
+"""Tests for replay.py (response recording and replay)."""
+import asyncio
+import gzip
+import json
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from onstar_component import OnStarData
+from onstar_component.replay import (
+    KIND_DIAGNOSTICS,
+    KIND_LOCATION,
+    ReplayOnStar,
+    ResponseRecorder,
+    _object_hook,
+    read_records,
+)
+
+
+def _response(payload):
+    """Build a response the same way the onstar library does."""
+    return json.loads(json.dumps(payload), object_hook=_object_hook)
+
+
+DIAGNOSTICS = {
+    "results": [
+        {
+            "vehicle": {"licensePlate": "ABC1234", "vehicleVIN": "VIN1"},
+            "updatedOn": "2019-10-16T10:54:52.535+02:00",
+            "warningCount": 0,
+            "errorCount": 1,
+            "reportData": {
+                "metrics": {
+                    "oilLife": 0.855,
+                    "fuelLevel": 0.72,
+                    "fuelRange": 450.2,
+                    "ignition": "OFF",
+                    "odometer": 45000.4,
+                    "tirePressureLf": 230,
+                    "tirePressureLr": 228,
+                    "tirePressureRf": 231,
+                    "tirePressureRr": 229,
+                    "tireStatusLf": "GREEN",
+                    "tireStatusLr": "GREEN",
+                    "tireStatusRf": "GREEN",
+                    "tireStatusRr": "YELLOW",
+                    "placardSetting": "Normal",
+                    "placardFront": 230,
+                    "placardRear": 230,
+                },
+                "maintenance": {
+                    "nextMaintDate": "2026-06-01",
+                    "nextMaintOdometer": 50000.0,
+                },
+                "sections": {"airbag": {"status": "GREEN"}},
+            },
+        }
+    ]
+}
+
+LOCATION = {"results": [{"index": 0, "location": [48.8566, 2.3522]}]}
+
+
+class TestResponseRecorder:
+    """Tests for writing recordings."""
+
+    def test_records_are_read_back_in_order(self, tmp_path):
+        recorder = ResponseRecorder(str(tmp_path))
+        recorder.record(KIND_DIAGNOSTICS, _response(DIAGNOSTICS), ts=10)
+        recorder.record(KIND_LOCATION, _response(LOCATION), ts=10)
+        recorder.close()
+
+        records = list(read_records(str(tmp_path)))
+        assert [r["kind"] for r in records] == [KIND_DIAGNOSTICS, KIND_LOCATION]
+        assert records[0]["data"] == DIAGNOSTICS
+        assert records[1]["data"]["results"][0]["location"] == [48.8566, 2.3522]
+
+    def test_files_are_gzip_ndjson(self, tmp_path):
+        recorder = ResponseRecorder(str(tmp_path))
+        recorder.record(KIND_LOCATION, _response(LOCATION), ts=1)
+        recorder.close()
+
+        (name,) = os.listdir(tmp_path)
+        with gzip.open(tmp_path / name, "rt") as fp:
+            lines = fp.read().splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["ts"] == 1
+
+    def test_rotation_keeps_backup_count(self, tmp_path):
+        recorder = ResponseRecorder(str(tmp_path), max_bytes=1, backup_count=2)
+        for ts in range(5):
+            recorder.record(KIND_LOCATION, _response(LOCATION), ts=ts)
+        recorder.close()
+
+        assert len(os.listdir(tmp_path)) == 3
+        # Oldest records were rotated away
+        assert [r["ts"] for r in read_records(str(tmp_path))] == [2, 3, 4]
+
+    def test_truncated_file_is_skipped(self, tmp_path):
+        (tmp_path / "onstar-20250101T000000-000.ndjson.gz").write_bytes(b"garbage")
+        assert list(read_records(str(tmp_path))) == []
+
+    def test_record_client(self, tmp_path):
+        client = MagicMock()
+        client.get_diagnostics.return_value = _response(DIAGNOSTICS)
+        client.get_location.return_value = _response(LOCATION)
+
+        recorder = ResponseRecorder(str(tmp_path))
+        recorder.record_client(client)
+        recorder.close()
+
+        kinds = [r["kind"] for r in read_records(str(tmp_path))]
+        assert kinds == [KIND_DIAGNOSTICS, KIND_LOCATION]
+
+
+class TestReplayOnStar:
+    """Tests for serving recorded responses."""
+
+    @pytest.fixture()
+    def recording(self, tmp_path):
+        recorder = ResponseRecorder(str(tmp_path))
+        for ts, errors in ((100, 1), (200, 2)):
+            diagnostics = json.loads(json.dumps(DIAGNOSTICS))
+            diagnostics["results"][0]["errorCount"] = errors
+            recorder.record(KIND_DIAGNOSTICS, _response(diagnostics), ts=ts)
+            recorder.record(KIND_LOCATION, _response(LOCATION), ts=ts)
+        recorder.close()
+        return str(tmp_path)
+
+    def test_refresh_advances_through_recording(self, recording):
+        replay = ReplayOnStar(recording)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(replay.refresh())
+            assert replay.get_diagnostics().results[0].errorCount == 1
+            assert replay.get_location().results[0].index == 0
+            loop.run_until_complete(replay.refresh())
+            assert replay.get_diagnostics().results[0].errorCount == 2
+            # Wraps around once exhausted
+            loop.run_until_complete(replay.refresh())
+            assert replay.get_diagnostics().results[0].errorCount == 1
+        finally:
+            loop.close()
+
+    def test_refresh_without_wake_skips_location(self, recording):
+        replay = ReplayOnStar(recording)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(replay.refresh(wake=False))
+            assert replay.get_diagnostics().results[0].errorCount == 1
+            assert replay.get_location() is None
+            loop.run_until_complete(replay.refresh())
+            assert replay.get_diagnostics().results[0].errorCount == 2
+        finally:
+            loop.close()
+
+    def test_speed_scales_recorded_gaps(self, recording):
+        replay = ReplayOnStar(recording, speed=50)
+        loop = asyncio.new_event_loop()
+        try:
+            with patch("onstar_component.replay.asyncio.sleep",
+                       new_callable=AsyncMock) as mock_sleep, \
+                    patch("onstar_component.replay.time") as mock_time:
+                mock_time.monotonic.return_value = 10.0
+                loop.run_until_complete(replay.refresh())
+                mock_sleep.assert_not_called()
+                loop.run_until_complete(replay.refresh())
+                mock_sleep.assert_called_once_with(2.0)
+        finally:
+            loop.close()
+
+    def test_speed_waits_only_remaining_gap(self, recording):
+        replay = ReplayOnStar(recording, speed=50)
+        loop = asyncio.new_event_loop()
+        try:
+            with patch("onstar_component.replay.asyncio.sleep",
+                       new_callable=AsyncMock) as mock_sleep, \
+                    patch("onstar_component.replay.time") as mock_time:
+                mock_time.monotonic.side_effect = [10.0, 11.5, 11.5]
+                loop.run_until_complete(replay.refresh())
+                # 1.5 s of the 2 s gap went by between the refreshes
+                loop.run_until_complete(replay.refresh())
+                mock_sleep.assert_called_once_with(0.5)
+        finally:
+            loop.close()
+
+    def test_cancelled_wait_keeps_record(self, recording):
+        replay = ReplayOnStar(recording, speed=0.001)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(replay.refresh())
+            with pytest.raises(asyncio.TimeoutError):
+                loop.run_until_complete(
+                    asyncio.wait_for(replay.refresh(), 0.01))
+            replay._speed = 0
+            loop.run_until_complete(replay.refresh())
+            assert replay.get_diagnostics().results[0].errorCount == 2
+        finally:
+            loop.close()
+
+    def test_empty_directory_raises(self, tmp_path):
+        replay = ReplayOnStar(str(tmp_path))
+        loop = asyncio.new_event_loop()
+        try:
+            with pytest.raises(FileNotFoundError):
+                loop.run_until_complete(replay.refresh())
+        finally:
+            loop.close()
+
+    def test_recording_without_diagnostics_raises(self, tmp_path):
+        recorder = ResponseRecorder(str(tmp_path))
+        recorder.record(KIND_LOCATION, _response(LOCATION), ts=100)
+        recorder.record(KIND_LOCATION, _response(LOCATION), ts=200)
+        recorder.close()
+        replay = ReplayOnStar(str(tmp_path))
+        loop = asyncio.new_event_loop()
+        try:
+            with pytest.raises(FileNotFoundError):
+                loop.run_until_complete(
+                    asyncio.wait_for(replay.refresh(), 5))
+        finally:
+            loop.close()
+
+    def test_onstar_data_uses_replay(self, recording):
+        """Replayed responses go through the regular extraction path."""
+        data = OnStarData(
+            "user", "pass", "1234", replay=ReplayOnStar(recording))
+        data.update().result()
+
+        assert data.status["onstar.plate"] == "ABC1234"
+        assert data.status["onstar.errorcount"] == 1
+        assert data.status["onstar.tirestatusrr"] is False
+        assert data.status["onstar.localization"] == [48.8566, 2.3522]
@@ -3,7 +3,7 @@ from unittest.mock import MagicMock, PropertyMock, patch
 
 import pytest
 
-from onstar_component.sensor import OnStarSensor, setup_platform
+from onstar_component.sensor import OnStarSectionSensor, OnStarSensor, setup_platform
 from onstar_component.const import DOMAIN
 
 
@@ -55,20 +55,29 @@ class TestSetupPlatform:
         # The unknown sensor should NOT generate an entity
         assert len(added) == len(status_with_unknown) - 1
 
-    def test_calls_data_update_with_no_throttle(self, mock_hass, mock_data):
-        """setup_platform should force an initial data update."""
+    def test_waits_for_shared_initial_fetch(self, mock_hass, mock_data):
+        """setup_platform should reuse the initial fetch, not start its own."""
         add_entities = MagicMock()
         setup_platform(mock_hass, {}, add_entities)
-        mock_data.update.assert_called_once_with(no_throttle=True)
+        mock_data.wait_for_initial_fetch.assert_called_once()
+        mock_data.update.assert_not_called()
 
-    def test_add_entities_called_with_update_flag(self, mock_hass, mock_data):
-        """add_entities should be called with update_before_add=True."""
-        add_entities = MagicMock()
+    def test_add_entities_called_without_update_flag(self, mock_hass, mock_data):
+        """Entities are seeded from the snapshot, update_before_add=False."""
+        added: list = []
+        add_entities = MagicMock(side_effect=lambda ents, update: added.extend(ents))
         setup_platform(mock_hass, {}, add_entities)
         add_entities.assert_called_once()
-        _, kwargs_or_args = add_entities.call_args
-        # Second positional arg should be True
-        assert add_entities.call_args[0][1] is True
+        assert add_entities.call_args[0][1] is False
+        fuel = next(e for e in added if e.type == "onstar.fuellevel")
+        assert fuel.native_value == 72
+
+    def test_not_ready_schedules_refresh(self, mock_hass_no_status, mock_data_no_status):
+        from homeassistant.exceptions import PlatformNotReady
+
+        with pytest.raises(PlatformNotReady):
+            setup_platform(mock_hass_no_status, {}, MagicMock())
+        mock_data_no_status.schedule_refresh.assert_called_once()
 
     def test_empty_status_creates_no_entities(self, mock_hass, mock_data):
         """An empty status dict should result in zero entities."""
@@ -80,6 +89,16 @@ class TestSetupPlatform:
         setup_platform(mock_hass, {}, add_entities)
         assert len(added) == 0
 
+    def test_only_enabled_fields_create_entities(self, mock_hass, mock_data):
+        """Fields fetched only as inputs of other values get no entity."""
+        mock_data.fields = {"onstar.fuellevel", "onstar.odometer"}
+
+        added: list = []
+        add_entities = MagicMock(side_effect=lambda ents, update: added.extend(ents))
+
+        setup_platform(mock_hass, {}, add_entities)
+        assert sorted(e.type for e in added) == ["onstar.fuellevel", "onstar.odometer"]
+
 
 # ==========================================================================
 # OnStarSensor tests
@@ -199,3 +218,115 @@ class TestOnStarSensor:
             sensor = OnStarSensor(mock_data, sensor_type)
             assert sensor._attr_name is not None
             assert sensor._attr_unique_id.startswith("onstar_")
+
+    # -- Staleness ------------------------------------------------------------
+
+    def test_attributes_expose_staleness(self, sensor):
+        attrs = sensor.extra_state_attributes
+        assert attrs["stale"] is False
+        assert "data_age" not in attrs
+        assert "last_refresh" not in attrs
+
+    def test_laststatus_is_the_diagnostic_sensor(self, mock_data):
+        from homeassistant.const import EntityCategory
+
+        sensor = OnStarSensor(mock_data, "onstar.laststatus")
+        attrs = sensor.extra_state_attributes
+        assert sensor._attr_entity_category == EntityCategory.DIAGNOSTIC
+        assert attrs["last_refresh"] == "2025-01-15T10:30:00+00:00"
+        assert attrs["connections_reused"] == 3
+        assert attrs["executor_queue_depth"] == 0
+        assert attrs["executor_failed"] == 1
+
+    def test_attributes_are_stable_between_refreshes(self, sensor, mock_data):
+        before = sensor.extra_state_attributes
+        mock_data.data_age = 312.5
+        mock_data.last_refresh += 300
+        mock_data.transport_stats = {"requests": 5, "connections_reused": 4}
+        assert sensor.extra_state_attributes == before
+
+    def test_update_schedules_background_refresh(self, sensor, mock_data):
+        sensor.update()
+        mock_data.schedule_refresh.assert_called_once()
+
+    def test_update_serves_stale_snapshot(self, sensor, mock_data):
+        """A stale but not expired snapshot keeps the last value."""
+        mock_data.stale = True
+        sensor.update()
+        assert sensor.native_value == 72
+        assert sensor.available is True
+        assert sensor.display_state() == "ON"
+
+    def test_expired_snapshot_makes_sensor_unavailable(self, sensor, mock_data):
+        mock_data.expired = True
+        sensor.update()
+        assert sensor.native_value is None
+        assert sensor.available is False
+        assert sensor.display_state() == "OFF"
+
+    # -- Change tracking ------------------------------------------------------
+
+    def test_attributes_expose_last_changed(self, sensor, mock_data):
+        attrs = sensor.extra_state_attributes
+        assert attrs["last_changed"] == "2025-01-15T10:30:00+00:00"
+        mock_data.last_changed.assert_called_with("onstar.fuellevel")
+
+    def test_update_skips_unchanged_revision(self, sensor, mock_data):
+        sensor.update()
+        sensor._state = "untouched"
+        sensor.update()
+        assert sensor.native_value == "untouched"
+
+        mock_data.revision = 2
+        sensor.update()
+        assert sensor.native_value == 72
+
+    def test_localization_exposes_address(self, mock_data):
+        sensor = OnStarSensor(mock_data, "onstar.localization")
+        assert sensor.extra_state_attributes["address"] == mock_data.address
+
+    def test_other_sensors_have_no_address(self, sensor):
+        assert "address" not in sensor.extra_state_attributes
+
+
+# ==========================================================================
+# OnStarSectionSensor tests
+# ==========================================================================
+
+
+class TestOnStarSectionSensor:
+    """Tests for the on demand diagnostics section sensors."""
+
+    def test_created_disabled_and_not_decoded(self, mock_hass, mock_data):
+        mock_data.report_sections = MagicMock(return_value=["brakes", "engineTransmission"])
+        added: list = []
+        add_entities = MagicMock(side_effect=lambda ents, update: added.extend(ents))
+
+        setup_platform(mock_hass, {}, add_entities)
+
+        sections = [e for e in added if isinstance(e, OnStarSectionSensor)]
+        assert [e.type for e in sections] == [
+            "onstar.section.brakes", "onstar.section.engineTransmission"]
+        assert all(not e._attr_entity_registry_enabled_default for e in sections)
+        assert sections[1]._attr_name == "Engine transmission diagnostics"
+        mock_data.section.assert_not_called()
+
+    def test_update_decodes_section(self, mock_data):
+        mock_data.section = MagicMock(
+            return_value={"status": "YELLOW", "brakeFluidLow": True})
+        sensor = OnStarSectionSensor(mock_data, "brakes")
+
+        sensor.update()
+
+        mock_data.section.assert_called_once_with("brakes")
+        assert sensor.native_value == "YELLOW"
+        assert sensor.extra_state_attributes["brakeFluidLow"] is True
+
+    def test_decoded_once_per_revision(self, mock_data):
+        mock_data.section = MagicMock(return_value={"status": "GREEN"})
+        sensor = OnStarSectionSensor(mock_data, "brakes")
+
+        sensor.update()
+        sensor.update()
+
+        mock_data.section.assert_called_once()
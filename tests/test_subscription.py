@@ -0,0 +1,159 @@
+"""Tests for subscription.py (status change streams)."""
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+from onstar_component import OnStarData
+from onstar_component.subscription import StatusChange, SubscriptionHub
+
+
+def _change(vin="VIN1", revision=1, **changes):
+    return StatusChange(vin, revision, 0.0, {
+        field.replace("_", "."): (None, value) for field, value in changes.items()
+    })
+
+
+class TestSubscription:
+    """Tests for the hub and its subscriptions."""
+
+    def test_iterator_receives_changes_published_from_threads(self):
+        hub = SubscriptionHub()
+
+        async def consume():
+            subscription = hub.subscribe(asyncio.get_running_loop())
+            publisher = threading.Thread(
+                target=lambda: [hub.publish(_change(revision=i)) for i in (1, 2)])
+            publisher.start()
+            received = [await subscription.__anext__() for _ in range(2)]
+            publisher.join()
+            subscription.close()
+            return received
+
+        received = asyncio.run(consume())
+        assert [change.revision for change in received] == [1, 2]
+        assert len(hub) == 0
+
+    def test_slow_consumer_drops_oldest(self):
+        hub = SubscriptionHub()
+
+        async def consume():
+            subscription = hub.subscribe(asyncio.get_running_loop(), maxsize=2)
+            for revision in range(1, 6):
+                hub.publish(_change(revision=revision))
+            received = [await subscription.__anext__() for _ in range(2)]
+            return received, subscription.dropped
+
+        received, dropped = asyncio.run(consume())
+        assert [change.revision for change in received] == [4, 5]
+        assert dropped == 3
+
+    def test_filters_by_vin_and_fields(self):
+        hub = SubscriptionHub()
+
+        async def consume():
+            subscription = hub.subscribe(
+                asyncio.get_running_loop(), vin="VIN1", fields=["onstar.fuellevel"])
+            hub.publish(_change(vin="VIN2", onstar_fuellevel=10))
+            hub.publish(_change(onstar_odometer=45000))
+            hub.publish(_change(onstar_odometer=45100, onstar_fuellevel=50))
+            return await subscription.__anext__()
+
+        change = asyncio.run(consume())
+        assert change.changes == {"onstar.fuellevel": (None, 50)}
+
+    def test_close_ends_iteration(self):
+        hub = SubscriptionHub()
+
+        async def consume():
+            subscription = hub.subscribe(asyncio.get_running_loop())
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.01, subscription.close)
+            return [change async for change in subscription]
+
+        assert asyncio.run(consume()) == []
+
+    def test_callback_runs_on_loop(self):
+        hub = SubscriptionHub()
+
+        async def listen():
+            received = []
+            loop_thread = threading.current_thread()
+            subscription = hub.subscribe(
+                asyncio.get_running_loop(),
+                callback=lambda change: received.append(
+                    (change.revision, threading.current_thread() is loop_thread)))
+            publisher = threading.Thread(target=hub.publish, args=(_change(),))
+            publisher.start()
+            publisher.join()
+            await asyncio.sleep(0.01)
+            subscription.close()
+            return received
+
+        assert asyncio.run(listen()) == [(1, True)]
+
+    def test_callback_errors_are_logged(self):
+        hub = SubscriptionHub()
+        callback = MagicMock(side_effect=[ValueError("boom"), None])
+
+        async def listen():
+            hub.subscribe(asyncio.get_running_loop(), callback=callback)
+            hub.publish(_change(revision=1))
+            hub.publish(_change(revision=2))
+            await asyncio.sleep(0.01)
+
+        asyncio.run(listen())
+        assert callback.call_count == 2
+
+
+class TestOnStarDataSubscription:
+    """Tests for subscribing to OnStarData."""
+
+    def test_refresh_publishes_changed_fields(self):
+        data = OnStarData("user", "pass", "1234")
+        statuses = iter([
+            {"onstar.vin": "VIN1", "onstar.odometer": 45000, "onstar.plate": "XYZ"},
+            {"onstar.vin": "VIN1", "onstar.odometer": 45100, "onstar.plate": "XYZ"},
+        ])
+        data._get_status = MagicMock(side_effect=lambda wake=None: next(statuses))
+
+        async def consume():
+            subscription = data.async_subscribe(vin="VIN1")
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, data._refresh)
+            await loop.run_in_executor(None, data._refresh)
+            return [await subscription.__anext__() for _ in range(2)]
+
+        first, second = asyncio.run(consume())
+        data.executor.shutdown()
+        assert first.revision == 1
+        assert set(first.changes) == {"onstar.vin", "onstar.odometer", "onstar.plate"}
+        assert second.changes == {"onstar.odometer": (45000, 45100)}
+
+    def test_snapshot_is_delivered_first(self):
+        data = OnStarData("user", "pass", "1234")
+        data._status = {"onstar.vin": "VIN1", "onstar.plate": "XYZ"}
+
+        async def consume():
+            async with data.async_subscribe(snapshot=True) as subscription:
+                return await subscription.__anext__()
+
+        change = asyncio.run(consume())
+        data.executor.shutdown()
+        assert change.vin == "VIN1"
+        assert change.changes["onstar.plate"] == (None, "XYZ")
+
+    def test_listener_can_be_removed(self):
+        data = OnStarData("user", "pass", "1234")
+        data._get_status = MagicMock(
+            side_effect=lambda wake=None: {"onstar.vin": "VIN1", "onstar.plate": "XYZ"})
+        callback = MagicMock()
+
+        async def listen():
+            remove = data.async_listen(callback)
+            remove()
+            await asyncio.get_running_loop().run_in_executor(None, data._refresh)
+            await asyncio.sleep(0.01)
+
+        asyncio.run(listen())
+        data.executor.shutdown()
+        callback.assert_not_called()
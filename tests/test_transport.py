@@ -0,0 +1,118 @@
+"""Tests for transport.py (pooled HTTP transport)."""
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from onstar_component import OnStarData
+from onstar_component.client import OnStarClient
+from onstar_component.transport import (
+    DNS_CACHE_TTL,
+    LIMIT_PER_HOST,
+    PooledTransport,
+)
+
+
+@pytest.fixture()
+def transport():
+    pooled = PooledTransport(timeout=5)
+    yield pooled
+    pooled.close()
+
+
+class TestPooledTransport:
+    """Tests for running requests on the long-lived session."""
+
+    def test_session_is_reused_across_runs(self, transport):
+        async def request(session):
+            return session
+
+        first = transport.run(request)
+        assert transport.run(request) is first
+
+    def test_runs_on_a_single_long_lived_loop(self, transport):
+        async def request(session):
+            return asyncio.get_running_loop(), threading.current_thread().name
+
+        loop, name = transport.run(request)
+        assert transport.run(request)[0] is loop
+        assert name == "onstar_transport"
+
+    def test_private_session_uses_keepalive_connector(self):
+        with patch("onstar_component.transport.aiohttp.TCPConnector") as connector:
+            pooled = PooledTransport()
+            session = pooled.run(AsyncMock(side_effect=lambda session: session))
+            pooled.close()
+        kwargs = connector.call_args[1]
+        assert kwargs["limit_per_host"] == LIMIT_PER_HOST
+        assert kwargs["ttl_dns_cache"] == DNS_CACHE_TTL
+        assert session.closed is True
+
+    def test_setup_keeps_requests_off_home_assistant_loop(self):
+        from onstar_component import setup
+        from onstar_component.const import DOMAIN
+
+        hass = MagicMock()
+        hass.data = {}
+        with patch("onstar_component.discovery"), patch.object(
+            OnStarData, "start_initial_fetch"
+        ):
+            setup(hass, {DOMAIN: {"username": "u", "password": "p"}})
+        data = hass.data[DOMAIN]
+
+        async def request(session):
+            return asyncio.get_running_loop(), threading.current_thread().name
+
+        loop, name = data.transport.run(request)
+        assert loop is not hass.loop
+        assert name == "onstar_transport"
+        data.transport.close()
+        data.executor.shutdown()
+
+    def test_errors_propagate(self, transport):
+        async def request(session):
+            raise ConnectionResetError("reset")
+
+        with pytest.raises(ConnectionResetError):
+            transport.run(request)
+
+    def test_stats_from_trace_events(self, transport):
+        async def request(session):
+            trace = session.trace_configs[0]
+            for _ in range(2):
+                ctx = SimpleNamespace()
+                await trace.on_request_start[0](session, ctx, None)
+                await trace.on_request_end[0](session, ctx, None)
+            await trace.on_connection_create_end[0](session, None, None)
+            await trace.on_connection_reuseconn[0](session, None, None)
+
+        transport.run(request)
+        stats = transport.stats
+        assert stats["requests"] == 2
+        assert stats["connections_created"] == 1
+        assert stats["connections_reused"] == 1
+        assert stats["avg_request_ms"] is not None
+
+
+class TestSharedSessionClient:
+    """Tests for the OnStar client using the pooled session."""
+
+    def test_login_uses_shared_session_and_keeps_it_open(self):
+        response = MagicMock()
+        response.text = AsyncMock(return_value='{"results": [{"token": "T"}]}')
+        session = MagicMock()
+        session.post = AsyncMock(return_value=response)
+        session.close = AsyncMock()
+
+        client = OnStarClient("user", "pass", "1234", None, session=session)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(client.refresh(wake=False))
+        finally:
+            loop.close()
+
+        assert session.post.call_args[1]["data"]["username"] == "user"
+        assert client._header == {"X-GM-token": "T"}
+        session.close.assert_not_called()
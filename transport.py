@@ -0,0 +1,131 @@
+"""
+Long-lived pooled HTTP transport for the OnStar client.
+
+Requests run on a persistent event loop with a single aiohttp session, so
+TCP and TLS connections, and resolved addresses, are reused across refresh
+cycles. The loop runs on its own thread, never Home Assistant's: the onstar
+library parses whole responses, location history included, inside its
+coroutines, and that CPU work must not hold Home Assistant's event loop.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 120
+LIMIT_PER_HOST = 4
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+# Errors of a failed exchange with the OnStar service
+TRANSPORT_ERRORS = (ConnectionResetError, aiohttp.ClientError, TimeoutError)
+
+
+class PooledTransport:
+    """Runs OnStar requests on a pooled, keep-alive HTTP session."""
+
+    def __init__(self, timeout=REQUEST_TIMEOUT):
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._stats = {
+            "requests": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+            "request_time": 0.0,
+        }
+
+    def _trace_config(self):
+        trace = aiohttp.TraceConfig()
+
+        def count(key):
+            async def handler(session, ctx, params):
+                self._stats[key] += 1
+            return handler
+
+        async def request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+
+        async def request_end(session, ctx, params):
+            self._stats["requests"] += 1
+            self._stats["request_time"] += time.perf_counter() - ctx.start
+
+        trace.on_request_start.append(request_start)
+        trace.on_request_end.append(request_end)
+        trace.on_connection_create_end.append(count("connections_created"))
+        trace.on_connection_reuseconn.append(count("connections_reused"))
+        trace.on_dns_cache_hit.append(count("dns_cache_hits"))
+        trace.on_dns_cache_miss.append(count("dns_cache_misses"))
+        return trace
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="onstar_transport",
+                    daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _get_session(self):
+        # Always called on the transport loop
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=LIMIT_PER_HOST,
+                    ttl_dns_cache=DNS_CACHE_TTL,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ),
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    def run(self, request):
+        """Run request(session) on the transport loop and return its result.
+
+        Must be called from a worker thread, never from the loop itself.
+        """
+        async def call():
+            return await request(self._get_session())
+
+        future = asyncio.run_coroutine_threadsafe(call(), self._get_loop())
+        try:
+            return future.result(self._timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    @property
+    def stats(self):
+        """Return connection reuse and latency statistics."""
+        stats = dict(self._stats)
+        requests = stats.pop("request_time")
+        stats["avg_request_ms"] = (
+            round(requests * 1000 / stats["requests"], 1)
+            if stats["requests"] else None)
+        return stats
+
+    def close(self):
+        """Close the session and stop the loop, if started."""
+        if self._loop is None:
+            return
+
+        async def close_session():
+            if self._session is not None:
+                await self._session.close()
+
+        asyncio.run_coroutine_threadsafe(close_session(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+        self._loop.close()
+        self._loop = None
+        self._session = None